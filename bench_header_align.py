@@ -0,0 +1,85 @@
+"""Benchmark fuzzy header alignment against brute-force comparison.
+
+Builds a synthetic document whose header paragraphs are returned the way
+the model tends to return them (case changed, punctuation trimmed, straight
+quotes for curly ones, a word dropped now and then), then aligns them with
+the trigram index and with a brute-force Dice comparison of every header
+against every paragraph. Both must agree on every alignment; the index
+should only look at a small fraction of the paragraphs.
+
+Usage: python bench_header_align.py [paragraphs] [headers]
+"""
+import random
+import string
+import sys
+import time
+
+from boldwords.docx_stream import Paragraph
+from boldwords.header_align import ALIGN_THRESHOLD, PREFIX_CHARS, ParagraphIndex, normalize_text, trigrams
+
+
+def random_words(rng, count):
+    return " ".join("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 9)))
+                    for _ in range(count))
+
+
+def as_returned(rng, header):
+    """The header as the model might send it back"""
+    text = header.replace("“", '"').replace("”", '"').replace("’", "'").rstrip(":?!.")
+    text = rng.choice([text.lower(), text.upper(), text.title(), text])
+    words = text.split()
+    if len(words) > 4 and rng.random() < 0.3:
+        del words[rng.randrange(len(words))]
+    return " ".join(words)
+
+
+def brute_force(texts, header, threshold):
+    grams = trigrams(normalize_text(header))
+    best_index, best_score = None, 0.0
+    for index, text in enumerate(texts):
+        if header.strip() in text:
+            return index
+        other = trigrams(normalize_text(text)[:PREFIX_CHARS])
+        if not other:
+            continue
+        score = 2 * len(grams & other) / (len(grams) + len(other))
+        if score > best_score:
+            best_index, best_score = index, score
+    return best_index if best_score >= threshold else None
+
+
+def main():
+    paragraph_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    header_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rng = random.Random(0)
+    texts = [random_words(rng, rng.randint(8, 60)) + "." for _ in range(paragraph_count)]
+    positions = sorted(rng.sample(range(paragraph_count), header_count))
+    for position in positions:
+        words = random_words(rng, rng.randint(2, 7)).split()
+        words[0] = f"“{words[0].capitalize()}’s”"
+        texts[position] = " ".join(words) + rng.choice(["", ":", "?"])
+    headers = [as_returned(rng, texts[position]) for position in positions]
+    paragraphs = [Paragraph(text, [(text, False)], None, None) for text in texts]
+
+    start = time.perf_counter()
+    index = ParagraphIndex(paragraphs)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    alignments = index.align_all(headers)
+    indexed = time.perf_counter() - start
+    scored = sum(len(index.candidates(trigrams(normalize_text(h)), ALIGN_THRESHOLD)) for h in headers)
+
+    start = time.perf_counter()
+    expected = [brute_force(texts, header, ALIGN_THRESHOLD) for header in headers]
+    brute = time.perf_counter() - start
+
+    assert [a.index for a in alignments] == expected
+    found = sum(a.index == position for a, position in zip(alignments, positions))
+    print(f"{paragraph_count} paragraphs, {header_count} headers; {found} aligned to their paragraph")
+    print(f"index build   {build * 1000:9.1f} ms")
+    print(f"indexed align {indexed * 1000:9.1f} ms  ({scored / header_count:.0f} candidate paragraphs per header)")
+    print(f"brute force   {brute * 1000:9.1f} ms  ({brute / indexed:.0f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
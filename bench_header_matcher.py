@@ -0,0 +1,74 @@
+"""Benchmark header matching as the header list grows.
+
+Compares the original per-paragraph keyword loop with the Aho-Corasick
+automaton and with the default HeaderMatcher (which only switches to the
+automaton from AUTOMATON_MIN_HEADERS headers) over a synthetic document,
+for increasing header counts.
+The matcher is compiled once per header list (as get_matcher does when a
+list is shared across documents), so compile time is reported separately.
+
+Usage: python bench_header_matcher.py [paragraphs] [repeat]
+"""
+import random
+import string
+import sys
+import time
+
+from boldwords.header_matcher import HeaderMatcher
+
+HEADER_COUNTS = (1, 10, 50, 100, 500, 1000, 5000)
+
+
+def random_phrase(rng, words):
+    return " ".join(
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+        for _ in range(words)
+    )
+
+
+def keyword_loop(paragraphs, headers):
+    return sum(1 for text in paragraphs if any(keyword in text for keyword in headers))
+
+
+def matched(paragraphs, matcher):
+    return sum(1 for text in paragraphs if text in matcher)
+
+
+def best_of(repeat, fn, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    paragraph_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    rng = random.Random(0)
+    paragraphs = [random_phrase(rng, rng.randint(5, 60)) for _ in range(paragraph_count)]
+
+    print(f"{paragraph_count} paragraphs, best of {repeat}")
+    print(
+        f"{'headers':>8} {'compile (ms)':>13} {'keyword loop (ms)':>18}"
+        f" {'automaton (ms)':>15} {'matcher (ms)':>13} {'speedup':>8}"
+    )
+    for count in HEADER_COUNTS:
+        headers = [random_phrase(rng, rng.randint(1, 4)) for _ in range(count)]
+        # Some paragraphs really are headers
+        for i in range(0, paragraph_count, max(1, paragraph_count // 20)):
+            paragraphs[i] = rng.choice(headers)
+        compile_time, automaton = best_of(repeat, HeaderMatcher, headers, 0)
+        loop_time, loop_hits = best_of(repeat, keyword_loop, paragraphs, headers)
+        auto_time, auto_hits = best_of(repeat, matched, paragraphs, automaton)
+        matcher_time, matcher_hits = best_of(repeat, matched, paragraphs, HeaderMatcher(headers))
+        assert loop_hits == auto_hits == matcher_hits
+        print(
+            f"{count:>8} {compile_time * 1000:>13.2f} {loop_time * 1000:>18.2f}"
+            f" {auto_time * 1000:>15.2f} {matcher_time * 1000:>13.2f} {loop_time / matcher_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Load-test LLMClient against the local stand-in server.
+
+Starts llm_standin on a free port with the given latency and error rate and
+sends header requests for a number of chunks through one client, as the app
+does for a long document. Reports wall time, per-chunk latency percentiles
+(waiting for a free slot included), retries and failures, for a few
+concurrency caps.
+
+Usage: python bench_llm_client.py [chunks] [latency] [error rate] [timeout]
+"""
+import asyncio
+import sys
+import time
+
+from boldwords.llm_client import LLMClient
+from boldwords.llm_standin import StandIn, serve_in_thread
+
+CONCURRENCY = (1, 4, 16, 64)
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))] if values else 0.0
+
+
+async def run(api_base, chunks, concurrency, timeout):
+    latencies = []
+
+    async def one(i):
+        started = time.perf_counter()
+        content = await client.chat(
+            [{"role": "user", "content": f"Identify the headers.\n\nChunk {i}\nSome body text here."}]
+        )
+        latencies.append(time.perf_counter() - started)
+        return content
+
+    async with LLMClient("standin", timeout=timeout, concurrency=concurrency, backoff=0.1,
+                         api_base=api_base, api_key="test") as client:
+        started = time.perf_counter()
+        outcomes = await client.map(one, range(chunks))
+        elapsed = time.perf_counter() - started
+    failures = sum(1 for _, error in outcomes if error is not None)
+    return elapsed, latencies, client.retries, failures
+
+
+def main():
+    chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    error_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+    timeout = float(sys.argv[4]) if len(sys.argv) > 4 else 5.0
+
+    standin = StandIn(latency=latency, jitter=latency / 2, error_rate=error_rate)
+    api_base, stop = serve_in_thread(standin)
+    print(f"{chunks} chunks, {latency}s latency, {error_rate:.0%} injected errors, {timeout}s timeout")
+    print(f"{'concurrency':>11} {'wall (s)':>9} {'p50 (s)':>8} {'p95 (s)':>8} {'retries':>8} {'failed':>7}")
+    try:
+        for concurrency in CONCURRENCY:
+            elapsed, latencies, retries, failures = asyncio.run(run(api_base, chunks, concurrency, timeout))
+            print(
+                f"{concurrency:>11} {elapsed:>9.2f} {percentile(latencies, 0.5):>8.3f}"
+                f" {percentile(latencies, 0.95):>8.3f} {retries:>8} {failures:>7}"
+            )
+    finally:
+        stop()
+    print(f"Server saw {standin.requests} requests, at most {standin.max_in_flight} at once")
+
+
+if __name__ == "__main__":
+    main()
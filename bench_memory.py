@@ -0,0 +1,74 @@
+"""Check that the stream engine extracts huge packages in bounded memory.
+
+Generates scripts with growing paragraph counts and MB of embedded media
+(corpus.generate_document), then extracts each one to /dev/null in a fresh
+interpreter and reports how much its peak resident set grew over the
+interpreter with the pipeline imported. The stream engine must stay under
+CEILING_MIB for every document, whatever its size; the exit status is 1
+otherwise. ``--engine docx`` measures python-docx for comparison, which
+loads every part of the package.
+
+Usage: python bench_memory.py [--sizes 1000:0,50000:256] [--engine stream] [--ceiling 16]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from boldwords.corpus import generate_document
+
+# paragraphs:MB of media
+SIZES = "1000:0,1000:256,50000:0,50000:256"
+CEILING_MIB = 16
+
+# ru_maxrss survives exec and would report the parent's peak; VmHWM is the
+# child's own (Linux only)
+CHILD = """
+import os, sys
+from boldwords import pipeline
+def peak():
+    with open("/proc/self/status") as status:
+        return next(int(line.split()[1]) for line in status if line.startswith("VmHWM:"))
+before = peak()
+pipeline.extract_to_files(sys.argv[1], os.devnull, os.devnull, sys.argv[3:], sys.argv[2])
+print((peak() - before) / 1024)
+"""
+
+
+def peak_growth(path, engine, headers):
+    """MiB the peak resident set of a fresh interpreter grows by while extracting ``path``"""
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, str(path), engine, *headers], capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the peak memory of extracting large .docx packages")
+    parser.add_argument("--sizes", default=SIZES, help="Comma-separated paragraphs:media-MB pairs")
+    parser.add_argument("--engine", choices=("stream", "docx"), default="stream")
+    parser.add_argument("--ceiling", type=float, default=CEILING_MIB, help="MiB allowed for the stream engine")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'paras':>8} {'media (MB)':>10} {'package (MB)':>12} {'peak growth (MiB)':>17}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes.split(","):
+            paragraphs, media = (int(value) for value in size.split(":"))
+            path = Path(workdir) / f"synthetic-{paragraphs}-{media}.docx"
+            headers = generate_document(path, paragraphs, headers=10, media=media)
+            growth = peak_growth(path, args.engine, headers)
+            over = args.engine == "stream" and growth > args.ceiling
+            failed |= over
+            print(f"{paragraphs:>8} {media:>10} {os.path.getsize(path) / 1e6:>12.1f} {growth:>17.1f}"
+                  + ("  over the ceiling" if over else ""))
+            path.unlink()
+    if args.engine == "stream":
+        print(f"Ceiling {args.ceiling:g} MiB: {'exceeded' if failed else 'ok'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
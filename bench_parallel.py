@@ -0,0 +1,84 @@
+"""Benchmark the two-phase parallel mode on one very large document.
+
+Extracts a synthetic script (100,000 paragraphs by default, see
+corpus.generate_document, which takes a few minutes to write one that
+size; pass --docx to reuse it) serially and then with growing numbers of
+worker processes, checks that every run writes byte-identical zfinal and
+zbold output, and reports for each run:
+
+- wall: elapsed time, and the speedup over the serial run
+- parent: CPU time of the parent process (cutting document.xml into
+  slices, the numbering pass and writing the output), which does not shrink
+  with more workers
+- workers: CPU time of the worker processes (parsing and preparing the
+  paragraphs), which is split between them
+
+With fewer CPUs than workers the wall time cannot show the speedup, so the
+time the run would take with one CPU per worker, the larger of the parent
+time and the worker time per worker (the two overlap), is reported too.
+
+Usage: python bench_parallel.py [--paragraphs 100000] [--jobs 1,2,4,8] [--engine stream] [--docx big.docx]
+"""
+import argparse
+import filecmp
+import os
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+from boldwords import pipeline
+from boldwords.corpus import generate_document, make_headers
+
+HEADERS = 200
+
+
+def cpu_times():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime
+
+
+def run(path, headers, engine, jobs, directory):
+    """Extract once; return (output paths, wall seconds, parent CPU seconds, worker CPU seconds)"""
+    outputs = (Path(directory) / f"zfinal-{jobs}.txt", Path(directory) / f"zbold-{jobs}.txt")
+    own, children = cpu_times()
+    start = time.perf_counter()
+    pipeline.extract_to_files(path, outputs[0], outputs[1], headers, engine, jobs=jobs)
+    wall = time.perf_counter() - start
+    own_after, children_after = cpu_times()
+    return outputs, wall, own_after - own, children_after - children
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel extraction of one large document")
+    parser.add_argument("--paragraphs", type=int, default=100000)
+    parser.add_argument("--jobs", default="1,2,4,8", help="worker counts to try, 1 being the serial engine")
+    parser.add_argument("--engine", choices=pipeline.ENGINES, default="stream")
+    parser.add_argument("--docx", help="document to use instead of generating one (headers from corpus.make_headers)")
+    args = parser.parse_args()
+
+    headers = make_headers(HEADERS)
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.docx
+        if path is None:
+            path = Path(directory) / "big.docx"
+            print(f"Generating {args.paragraphs} paragraphs ...")
+            generate_document(path, args.paragraphs, headers=HEADERS, subsections=30)
+        print(f"{path}: {os.path.getsize(path) / 1e6:.1f} MB, engine {args.engine}, {os.cpu_count()} CPUs")
+        print(f"{'jobs':>5} {'wall (s)':>9} {'speedup':>8} {'parent (s)':>11} {'workers (s)':>12} "
+              f"{'1 CPU/job (s)':>14} {'speedup':>8}")
+        serial = None
+        for jobs in (int(jobs) for jobs in args.jobs.split(",")):
+            outputs, wall, parent, workers = run(path, headers, args.engine, jobs, directory)
+            if serial is None:
+                serial = outputs, wall
+            elif not all(filecmp.cmp(a, b, shallow=False) for a, b in zip(outputs, serial[0])):
+                raise SystemExit(f"Output with {jobs} jobs differs from the serial output")
+            projected = max(parent, workers / jobs) if jobs > 1 else wall
+            print(f"{jobs:>5} {wall:>9.2f} {serial[1] / wall:>7.1f}x {parent:>11.2f} {workers:>12.2f} "
+                  f"{projected:>14.2f} {serial[1] / projected:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
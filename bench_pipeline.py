@@ -0,0 +1,159 @@
+"""Benchmark the extraction pipeline on synthetic documents of growing size.
+
+For each size a document is generated with corpus.generate_document and the
+pipeline stages are timed on it:
+
+- read_paragraphs: parse the .docx into Paragraph records (per engine)
+- convert_docx_to_text: the file-to-zfinal-lines conversion (per engine)
+- extract_bold_words: the legacy re-extraction from the rendered lines
+- process_document: app.py's outline and bold-span step on parsed paragraphs
+  (skipped when streamlit is not installed)
+
+Results are written as JSON (commit, environment, and min/median/mean
+seconds per stage and size) so runs on different commits can be compared::
+
+    python bench_pipeline.py -o before.json
+    git checkout other-branch
+    python bench_pipeline.py -o after.json --compare before.json
+
+Usage: python bench_pipeline.py [--sizes 100,1000,10000] [--repeat 5] [-o results.json] [--compare old.json]
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from boldwords import pipeline
+from boldwords.corpus import generate_document
+
+SIZES = (100, 1000, 10000)
+RUNS = 4
+BOLD_DENSITY = 0.2
+HEADERS = 10
+SUBSECTIONS = 3
+
+
+def load_app():
+    """Import streamlit_app/app.py quietly, or return None when streamlit is missing"""
+    try:
+        import streamlit  # noqa: F401
+    except ImportError:
+        return None
+    # Outside ``streamlit run`` every st call logs a warning
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    sys.path.insert(0, str(Path(__file__).resolve().parent / "streamlit_app"))
+    import app
+    app.debug_mode = False
+    return app
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(repeat, fn, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def run_benchmarks(sizes, repeat, engines, workdir):
+    app = load_app()
+    if app is None:
+        print("streamlit is not installed; skipping process_document")
+    results = []
+
+    def record(name, engine, size, times):
+        entry = {
+            "benchmark": name,
+            "engine": engine,
+            "paragraphs": size,
+            "min": min(times),
+            "median": statistics.median(times),
+            "mean": statistics.mean(times),
+        }
+        results.append(entry)
+        label = f"{name}[{engine}]" if engine else name
+        print(f"{label:>30} {size:>8} {entry['min'] * 1000:>10.2f} {entry['median'] * 1000:>11.2f}")
+
+    print(f"{'benchmark':>30} {'paras':>8} {'min (ms)':>10} {'median (ms)':>11}")
+    for size in sizes:
+        path = Path(workdir) / f"synthetic-{size}.docx"
+        headers = generate_document(path, size, RUNS, BOLD_DENSITY, HEADERS, SUBSECTIONS)
+        for engine in engines:
+            times, paragraphs = measure(repeat, pipeline.read_paragraphs, path, engine)
+            record("read_paragraphs", engine, size, times)
+            times, formatted_text = measure(repeat, pipeline.convert_docx_to_text, path, headers, engine)
+            record("convert_docx_to_text", engine, size, times)
+        times, _ = measure(repeat, pipeline.extract_bold_words, formatted_text)
+        record("extract_bold_words", None, size, times)
+        if app is not None:
+            times, _ = measure(repeat, app.process_document, paragraphs, headers)
+            record("process_document", None, size, times)
+    return results
+
+
+def compare(results, baseline):
+    """Print the median of each benchmark against the same one in ``baseline``"""
+    key = lambda entry: (entry["benchmark"], entry["engine"], entry["paragraphs"])
+    old = {key(entry): entry for entry in baseline["results"]}
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} (median, new / old):")
+    for entry in results:
+        before = old.get(key(entry))
+        if before is None:
+            continue
+        label = f"{entry['benchmark']}[{entry['engine']}]" if entry["engine"] else entry["benchmark"]
+        ratio = entry["median"] / before["median"] if before["median"] else float("inf")
+        print(f"{label:>30} {entry['paragraphs']:>8} {ratio:>8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the extraction pipeline on synthetic documents")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="Comma-separated paragraph counts")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--engine", choices=pipeline.ENGINES, action="append",
+                        help="Engine to time (repeatable; default all)")
+    parser.add_argument("-o", "--output", help="JSON results file (default bench_results/pipeline-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier JSON results file to compare with")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    engines = args.engine or list(pipeline.ENGINES)
+    commit = git_commit()
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_benchmarks(sizes, args.repeat, engines, workdir)
+
+    output = Path(args.output or f"bench_results/pipeline-{commit or 'unknown'}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "corpus": {"runs": RUNS, "bold_density": BOLD_DENSITY, "headers": HEADERS, "subsections": SUBSECTIONS},
+        "results": results,
+    }, indent=2) + "\n", encoding="utf-8")
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
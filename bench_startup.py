@@ -0,0 +1,47 @@
+"""Measure how long the entry points take to start.
+
+Each command runs in a fresh interpreter; the best of several runs is
+reported, next to a bare ``python -c pass`` for the interpreter's own
+start-up cost. Heavy dependencies (python-docx/lxml, openai, aiohttp) are
+only imported when first used, so these should stay close to the bare
+interpreter.
+
+Usage: python bench_startup.py [repeat]
+"""
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+COMMANDS = (
+    ("python -c pass", [sys.executable, "-c", "pass"]),
+    ("import boldwords", [sys.executable, "-c", "import boldwords"]),
+    ("from boldwords import extract", [sys.executable, "-c", "from boldwords import extract"]),
+    ("boldwords --help", [sys.executable, "-m", "boldwords", "--help"]),
+    ("working2.py --help", [sys.executable, "working2.py", "--help"]),
+    ("import docx (python-docx)", [sys.executable, "-c", "import docx"]),
+    ("import openai", [sys.executable, "-c", "import openai"]),
+)
+
+
+def best_of(repeat, command):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    print(f"best of {repeat}")
+    print(f"{'command':<32} {'time (ms)':>10}")
+    for name, command in COMMANDS:
+        print(f"{name:<32} {best_of(repeat, command) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
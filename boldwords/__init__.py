@@ -0,0 +1,61 @@
+"""Extract bold terms from .docx scripts, organised by section and subsection.
+
+The library API is importable from the package itself::
+
+    from boldwords import extract
+    lines, spans = extract("script.docx", ["Intro", "Closing"])
+    for span in spans:
+        print(span.render())        # "1a: term"
+
+Submodules are only imported when one of their names is first used, so
+``import boldwords`` and the ``boldwords`` command start without loading
+python-docx, openai or aiohttp.
+"""
+
+from importlib import import_module
+
+__version__ = "0.1.0"
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    "ENGINES": "pipeline",
+    "extract": "pipeline",
+    "extract_to_files": "pipeline",
+    "iter_docx_paragraphs": "pipeline",
+    "read_paragraphs": "pipeline",
+    "convert_docx_to_text": "pipeline",
+    "extract_bold_words": "pipeline",
+    "Paragraph": "docx_stream",
+    "build_outline": "extraction",
+    "iter_bold_spans": "extraction",
+    "BoldSpan": "extraction",
+    "SectionHeader": "extraction",
+    "Subsection": "extraction",
+    "BodyText": "extraction",
+    "Numbering": "numbering",
+    "HeaderMatcher": "header_matcher",
+    "get_matcher": "header_matcher",
+    "align_headers": "header_align",
+    "detect_headers": "header_detect",
+    "HeaderCache": "header_cache",
+    "LLMClient": "llm_client",
+    "Profile": "profiling",
+    "TermWriter": "records",
+    "TermIndex": "term_index",
+    "run_batch": "batch",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
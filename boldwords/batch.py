@@ -0,0 +1,146 @@
+"""Batch mode for the boldwords command: many documents on a pool of worker processes.
+
+``boldwords scripts/ header1 header2 -j 8 -o out/`` processes every
+.docx in ``scripts/`` (a glob such as ``'scripts/**/*.docx'`` works too) and
+writes ``out/<name>.zfinal.txt`` and ``out/<name>.zbold.txt`` for each one.
+With ``--terms`` the bold terms of every document are also appended to one
+JSON Lines, CSV or Parquet dataset (see records); the workers send their
+records back and the parent process is the only writer. A document that
+fails is reported and counted, and leaves no output files; the rest of the
+batch carries on.
+"""
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from . import pipeline
+from .profiling import NULL_PROFILE, Profile
+from .records import TermWriter, span_rows
+
+_GLOB_CHARS = set("*?[")
+
+
+def is_batch_input(target):
+    """True when ``target`` names a directory or a glob rather than a single file"""
+    return Path(target).is_dir() or bool(_GLOB_CHARS & set(target))
+
+
+def find_documents(target):
+    """Return the sorted .docx paths in a directory, or matching a glob"""
+    if Path(target).is_dir():
+        paths = Path(target).glob("*.docx")
+    else:
+        paths = (Path(p) for p in glob.glob(target, recursive=True))
+    # Skip Word's "~$name.docx" lock files
+    return sorted(p for p in paths if p.is_file() and not p.name.startswith("~$"))
+
+
+def output_paths(docx_file, output_dir):
+    stem = Path(docx_file).stem
+    return Path(output_dir) / f"{stem}.zfinal.txt", Path(output_dir) / f"{stem}.zbold.txt"
+
+
+class _RowCollector:
+    """Stands in for a TermWriter in a worker, keeping the records to send back"""
+
+    def __init__(self):
+        self.rows = []
+
+    def write(self, document, spans):
+        self.rows.extend(span_rows(document, spans))
+
+
+def process_one(docx_file, headers, output_dir, engine, profiled=False, terms=False, numbering=None,
+                containers=None):
+    """Worker: extract one document
+
+    Returns (path, seconds, bold count, error message, stage timings, term
+    records), the timings being Profile.stages when ``profiled`` and the
+    records a list of records.COLUMNS tuples when ``terms``, None otherwise.
+    """
+    start = time.perf_counter()
+    profile = Profile() if profiled else NULL_PROFILE
+    stages = profile.stages if profiled else None
+    collector = _RowCollector() if terms else None
+    try:
+        formatted_output_file, bold_words_output_file = output_paths(docx_file, output_dir)
+        section_counts = pipeline.extract_to_files(docx_file, formatted_output_file, bold_words_output_file, headers,
+                                                   engine, profile, collector, numbering,
+                                                   containers=containers)
+        return (str(docx_file), time.perf_counter() - start, sum(section_counts.values()), None, stages,
+                collector and collector.rows)
+    except Exception as e:
+        return str(docx_file), time.perf_counter() - start, 0, f"{type(e).__name__}: {e}", stages, None
+
+
+def run_batch(target, headers, output_dir=".", jobs=None, engine="docx", profiled=False, terms=None,
+              terms_format=None, numbering=None, containers=None):
+    """Process every document matched by ``target``; return a process exit code
+
+    ``terms`` is a JSON Lines/CSV file or Parquet dataset the term records of
+    every document are appended to, in ``terms_format`` (default: from its
+    suffix).
+    """
+    paths = find_documents(target)
+    if not paths:
+        print(f"Error: No .docx files found for '{target}'")
+        return 1
+
+    stems = {}
+    for path in paths:
+        stems.setdefault(path.stem, []).append(path)
+    clashes = [names for names in stems.values() if len(names) > 1]
+    if clashes:
+        print("Error: Documents with the same name would overwrite each other's output:")
+        for names in clashes:
+            print("  " + ", ".join(str(p) for p in names))
+        return 1
+
+    jobs = jobs or os.cpu_count() or 1
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    print(f"Processing {len(paths)} documents with {jobs} workers (engine: {engine})")
+    print(f"Using headers: {', '.join(headers)}")
+
+    started = time.perf_counter()
+    failures = []
+    busy = 0.0
+    bold_total = 0
+    profile = Profile()
+    writer = TermWriter(terms, terms_format) if terms else None
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(process_one, path, headers, output_dir, engine, profiled, writer is not None,
+                               numbering, containers)
+                   for path in paths]
+        for future in as_completed(futures):
+            path, seconds, bold_count, error, stages, rows = future.result()
+            busy += seconds
+            if stages:
+                profile.merge(stages)
+            if rows:
+                writer.write_rows(rows)
+            if error:
+                failures.append((path, error))
+                print(f"FAIL {seconds:8.3f}s  {path}: {error}")
+            else:
+                bold_total += bold_count
+                print(f"ok   {seconds:8.3f}s  {bold_count:6d} bold  {path}")
+    if writer is not None:
+        writer.close()
+    elapsed = time.perf_counter() - started
+
+    print("\nSummary:")
+    print(f"Documents: {len(paths) - len(failures)} succeeded, {len(failures)} failed")
+    print(f"Bold words: {bold_total}")
+    print(f"Wall time: {elapsed:.3f}s ({len(paths) / elapsed:.1f} documents/s)")
+    print(f"Worker time: {busy:.3f}s (mean {busy / len(paths):.3f}s per document)")
+    print(f"Outputs written to {output_dir}")
+    if writer is not None:
+        print(f"{writer.rows} term records appended to {writer.path} ({writer.format})")
+    if profiled:
+        print("\nStage timings (worker time, all documents):")
+        print(profile.report())
+    for path, error in failures:
+        print(f"Failed: {path}: {error}")
+    return 1 if failures else 0
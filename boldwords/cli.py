@@ -0,0 +1,102 @@
+"""Command line entry point: ``boldwords`` (or ``python -m boldwords``)."""
+import argparse
+import sys
+from pathlib import Path
+
+from . import batch
+from .docx_stream import CONTAINERS, get_containers
+from .pipeline import ENGINES, process_document
+from .profiling import NULL_PROFILE, Profile
+from .numbering import SCHEMES, Numbering
+from .records import FORMATS, TermWriter, format_for
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert a .docx file to zfinal.txt and extract its bold words to zbold.txt. "
+                    "Given a directory or a glob, every matching .docx is processed on a pool of worker "
+                    "processes and written to <name>.zfinal.txt / <name>.zbold.txt in --output-dir.",
+    )
+    parser.add_argument("docx_file", help="input .docx file, or a directory or glob of them")
+    parser.add_argument("headers", nargs="+",
+                        help="section header text (at least one is required); a leading \"-\" is short for "
+                             "--bold-output - so the bold words can be piped")
+    parser.add_argument("--engine", choices=ENGINES, default="docx",
+                        help="paragraph reader: python-docx object tree (docx) or streaming document.xml parser (stream)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="batch mode: number of worker processes (default: number of CPUs); single file: "
+                             "prepare the paragraphs of one large document on this many processes (default: 1)")
+    parser.add_argument("-o", "--output-dir", default=".",
+                        help="batch mode: directory for the per-document outputs (default: current directory)")
+    parser.add_argument("-f", "--formatted-output", default="zfinal.txt",
+                        help="single file: where to write the formatted text, - for stdout (default: zfinal.txt)")
+    parser.add_argument("-b", "--bold-output", default="zbold.txt",
+                        help="single file: where to write the bold words, - for stdout (default: zbold.txt)")
+    parser.add_argument("--numbering", default="alpha",
+                        help=f"subsection labels, one scheme per level ({', '.join(SCHEMES)}); more than one nests "
+                             "numbered list items, e.g. alpha,roman gives 1a, 1a.i, 1a.ii (default: alpha)")
+    parser.add_argument("--containers", default="body",
+                        help=f"where to read paragraphs from besides the top level of the document body (body), "
+                             f"which is always read as it holds the section headers: all, or a comma-separated "
+                             f"list of {', '.join(CONTAINERS[1:])} (default: body only)")
+    parser.add_argument("-t", "--terms",
+                        help="also append the bold terms as records to this .jsonl or .csv file, or Parquet dataset "
+                             "directory (document, section, subsection, section_id, term, paragraph, start, end, "
+                             "container)")
+    parser.add_argument("--terms-format", choices=FORMATS,
+                        help="format of --terms (default: from its suffix; no suffix is a Parquet dataset)")
+    parser.add_argument("--profile", action="store_true",
+                        help="print the time spent in each pipeline stage (summed over documents in batch mode)")
+    args = parser.parse_args()
+    
+    docx_file = args.docx_file
+    if args.headers[0] == "-":
+        args.bold_output = "-"
+        args.headers = args.headers[1:]
+        if not args.headers:
+            parser.error("the following arguments are required: headers")
+    
+    try:
+        numbering = Numbering(args.numbering)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        containers = get_containers(args.containers)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    if args.terms and not args.terms_format:
+        try:
+            format_for(args.terms)
+        except ValueError as e:
+            parser.error(str(e))
+    
+    if batch.is_batch_input(docx_file):
+        sys.exit(batch.run_batch(docx_file, args.headers, args.output_dir, args.jobs, args.engine, args.profile,
+                                 args.terms, args.terms_format, numbering, containers))
+    
+    formatted_output_file = args.formatted_output
+    bold_words_output_file = args.bold_output
+    # Status messages go to stderr when an output is streamed to stdout
+    status = sys.stderr if "-" in (formatted_output_file, bold_words_output_file) else sys.stdout
+    
+    if not Path(docx_file).exists():
+        print(f"Error: Input file '{docx_file}' does not exist", file=status)
+        sys.exit(1)
+    
+    # Get headers (now required)
+    headers = args.headers
+    print(f"Using headers: {', '.join(headers)}", file=status)
+    
+    profile = Profile() if args.profile else NULL_PROFILE
+    terms = TermWriter(args.terms, args.terms_format) if args.terms else None
+    try:
+        ok = process_document(docx_file, formatted_output_file, bold_words_output_file, headers, args.engine, profile,
+                              terms, numbering, args.jobs, containers)
+    finally:
+        if terms is not None:
+            terms.close()
+    if not ok:
+        sys.exit(1)
+    if args.profile:
+        print("\nStage timings:", file=status)
+        print(profile.report(), file=status)
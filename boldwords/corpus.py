@@ -0,0 +1,118 @@
+"""Synthetic .docx scripts for benchmarking the extraction pipeline.
+
+``generate_document`` writes a script shaped like the real ones: short bold
+section headers, each followed by lettered subsection paragraphs ("a. ",
+"b. ", ...) and body paragraphs whose runs are bold at a given rate. The
+header texts depend only on the seed and the header count, so every
+document generated with the same settings shares one header list and can be
+processed in a single batch::
+
+    python -m boldwords.corpus corpus/ --paragraphs 10000 --count 8
+    boldwords corpus/ $(cat corpus/headers.txt) -o out/
+
+(headers.txt holds one header per line; quote them when they contain spaces).
+
+``--media`` adds that many MB of image parts, as embedded pictures and video
+thumbnails do in real scripts; they are related to the document but never
+shown, so only the package grows.
+"""
+import argparse
+import random
+from pathlib import Path
+
+from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE
+from docx.opc.packuri import PackURI
+from docx.opc.part import Part
+
+WORDS = (
+    "model data system agent learning network training human machine language "
+    "image decision future world research problem answer question process energy "
+    "value market robot vision memory signal policy reason pattern scale"
+).split()
+
+
+def random_words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def add_media(document, megabytes, rng, part_size=8 * 1024 * 1024):
+    """Relate ``megabytes`` MB of random image parts to ``document``"""
+    remaining = megabytes * 1024 * 1024
+    number = 0
+    while remaining > 0:
+        number += 1
+        size = min(part_size, remaining)
+        # Random bytes do not compress, so the package really is this big
+        blob = rng.getrandbits(size * 8).to_bytes(size, "little")
+        part = Part(PackURI(f"/word/media/image{number}.png"), "image/png", blob, document.part.package)
+        document.part.relate_to(part, RELATIONSHIP_TYPE.IMAGE)
+        remaining -= size
+
+
+def make_headers(count, seed=0):
+    """Return ``count`` distinct header texts for ``seed``"""
+    rng = random.Random(f"headers-{seed}")
+    return [f"Part {i + 1}: {random_words(rng, rng.randint(2, 5)).title()}" for i in range(count)]
+
+
+def generate_document(path, paragraphs=200, runs=4, bold_density=0.2, headers=5, subsections=3, seed=0, media=0):
+    """Write a synthetic script to ``path`` and return its header list
+
+    ``paragraphs`` counts every paragraph, headers included. Each paragraph
+    has ``runs`` runs of a few words, each bold with probability
+    ``bold_density``. The non-header paragraphs are shared out between the
+    ``headers`` sections; the first ``subsections`` paragraphs of a section
+    (at most 26) carry a typed "a. ", "b. ", ... label. ``media`` MB of
+    image parts are added to the package.
+    """
+    header_texts = make_headers(headers, seed)
+    rng = random.Random(f"{seed}-{path}")
+    subsections = min(subsections, 26)
+    body = max(0, paragraphs - headers)
+
+    document = Document()
+    for section, header in enumerate(header_texts):
+        document.add_paragraph().add_run(header).bold = True
+        share = body // headers + (1 if section < body % headers else 0)
+        for i in range(share):
+            paragraph = document.add_paragraph()
+            if i < subsections:
+                paragraph.add_run(f"{chr(ord('a') + i)}. ")
+            for _ in range(runs):
+                run = paragraph.add_run(random_words(rng, rng.randint(1, 8)) + " ")
+                run.bold = rng.random() < bold_density
+    add_media(document, media, rng)
+    document.save(str(path))
+    return header_texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic .docx scripts for benchmarking")
+    parser.add_argument("output_dir")
+    parser.add_argument("--paragraphs", type=int, default=200, help="Paragraphs per document, headers included")
+    parser.add_argument("--runs", type=int, default=4, help="Runs per paragraph")
+    parser.add_argument("--bold-density", type=float, default=0.2, help="Share of runs that are bold")
+    parser.add_argument("--headers", type=int, default=5, help="Section headers per document")
+    parser.add_argument("--subsections", type=int, default=3, help="Lettered subsections per section (at most 26)")
+    parser.add_argument("--media", type=int, default=0, help="MB of image parts per document")
+    parser.add_argument("--count", type=int, default=1, help="Number of documents")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(args.count):
+        path = output_dir / f"synthetic-{args.paragraphs}-{i}.docx"
+        generate_document(
+            path, args.paragraphs, args.runs, args.bold_density, args.headers, args.subsections, args.seed,
+            args.media,
+        )
+        print(f"Wrote {path}")
+    headers = make_headers(args.headers, args.seed)
+    (output_dir / "headers.txt").write_text("\n".join(headers) + "\n", encoding="utf-8")
+    print(f"Headers: {', '.join(headers)}")
+
+
+if __name__ == "__main__":
+    main()
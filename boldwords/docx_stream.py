@@ -0,0 +1,533 @@
+"""Streaming reader for the main document part of a .docx file.
+
+python-docx builds a proxy object for every paragraph and run in the package
+before any of it can be read. This module reads ``word/document.xml`` straight
+out of the zip with ``iterparse`` and yields one paragraph at a time, dropping
+each element as soon as it has been consumed.
+
+The text and bold values follow python-docx exactly, so both engines produce
+the same zfinal/zbold output:
+
+- a paragraph's text is its direct ``w:r`` runs plus the runs of any direct
+  ``w:hyperlink`` children, while its runs are the direct ``w:r`` only
+- a run's text is made from its ``w:t``, ``w:tab``, ``w:ptab``, ``w:br``,
+  ``w:cr`` and ``w:noBreakHyphen`` children
+- a run is bold only when its own ``w:rPr`` carries a true ``w:b``
+- the style is the UI name of the paragraph's style, or of the default
+  paragraph style when it has none, read from ``word/styles.xml``
+
+Paragraphs are reported as ``Paragraph`` records, which python-docx based
+readers produce too.
+
+Only the package relationships, ``word/document.xml`` and ``word/styles.xml``
+are opened, and both XML parts are streamed; images, video thumbnails and the
+other parts are never read. Peak memory therefore does not grow with the size
+of the package or the number of paragraphs: it is the zip directory plus the
+largest single body-level block (a paragraph, or a whole table). bench_memory.py
+checks that extracting a 50,000 paragraph script with 256 MB of media stays
+within 16 MiB of peak resident memory over the interpreter's own.
+
+Beyond the top level of the body, ``StoryWalker`` reads the paragraphs of
+tables, text boxes, content controls, page headers and footers, footnotes
+and endnotes (``CONTAINERS``) in one walk of each part, tagging each with
+its container. They come in document order: a table's paragraphs where the
+table is, a text box's and a note's after the paragraph holding it, and the
+headers and footers of a section where its properties are, which for most
+documents is the end of the body. iter_paragraphs only walks that far when
+asked for more than the body.
+
+For the two-phase mode of the parallel module, ``BodySlices`` cuts the body
+of document.xml into slices of whole body-level blocks without parsing it,
+and ``parse_body_slice`` reads one slice, in a worker process, as the
+paragraphs iter_paragraphs would have read from it.
+"""
+import io
+import posixpath
+import re
+import zipfile
+from collections import namedtuple
+from functools import partial
+from xml.etree.ElementTree import iterparse, parse
+
+from .profiling import NULL_PROFILE
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+MC = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+_RELATIONSHIPS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+OFFICE_DOCUMENT = _RELATIONSHIPS + "officeDocument"
+STYLES = _RELATIONSHIPS + "styles"
+HEADER = _RELATIONSHIPS + "header"
+FOOTER = _RELATIONSHIPS + "footer"
+FOOTNOTES = _RELATIONSHIPS + "footnotes"
+ENDNOTES = _RELATIONSHIPS + "endnotes"
+
+# text: paragraph text; runs: (text, bold) pairs; style: style name or None;
+# level: list numbering level (0 is the outermost) or None when not numbered;
+# container: where the paragraph is, one of CONTAINERS
+Paragraph = namedtuple("Paragraph", "text runs style level container", defaults=("body",))
+
+# body: a direct child of w:body; table, textbox, control: within a table, a
+# text box, or a content control or custom XML element of the body; header,
+# footer, footnote, endnote: anywhere in one of those stories
+CONTAINERS = ("body", "table", "textbox", "control", "header", "footer", "footnote", "endnote")
+BODY_ONLY = frozenset(["body"])
+
+_BODY = W + "body"
+_P = W + "p"
+_R = W + "r"
+_HYPERLINK = W + "hyperlink"
+_RPR = W + "rPr"
+_B = W + "b"
+_VAL = W + "val"
+_TYPE = W + "type"
+_PPR = W + "pPr"
+_PSTYLE = W + "pStyle"
+_NUMPR = W + "numPr"
+_ILVL = W + "ilvl"
+_NUMID = W + "numId"
+_STYLE = W + "style"
+_STYLE_ID = W + "styleId"
+_NAME = W + "name"
+_DEFAULT = W + "default"
+_ON = ("1", "true", "on")
+
+# python-docx reports these built-in styles by their UI names
+_UI_STYLE_NAMES = {"caption": "Caption", "footer": "Footer", "header": "Header"}
+_UI_STYLE_NAMES.update({f"heading {n}": f"Heading {n}" for n in range(1, 10)})
+
+_RUN_TEXT = {
+    W + "tab": "\t",
+    W + "ptab": "\t",
+    W + "cr": "\n",
+    W + "noBreakHyphen": "-",
+}
+_T = W + "t"
+_BR = W + "br"
+
+
+def get_containers(containers):
+    """A frozenset of CONTAINERS from None (the body only), "all", or a list or "table,footnote" string of them
+
+    The body is always included: its paragraphs hold the section headers,
+    without which no term belongs to a section.
+    """
+    if containers is None:
+        return BODY_ONLY
+    if isinstance(containers, str):
+        if containers.strip() == "all":
+            return frozenset(CONTAINERS)
+        containers = [container.strip() for container in containers.split(",") if container.strip()]
+    containers = frozenset(containers)
+    unknown = sorted(containers.difference(CONTAINERS))
+    if unknown:
+        raise ValueError(f"Unknown container {', '.join(unknown)}; "
+                         f"expected all or a comma-separated list of {', '.join(CONTAINERS)}")
+    return containers | BODY_ONLY
+
+
+def part_relationships(package, part_name):
+    """Return ``{id: (type, member name)}`` for the internal relationships of a part"""
+    directory, name = posixpath.split(part_name)
+    try:
+        rels = parse(package.open(posixpath.join(directory, "_rels", name + ".rels"))).getroot()
+    except KeyError:
+        return {}
+    related = {}
+    for rel in rels.iter(REL + "Relationship"):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target")
+        if target.startswith("/"):
+            target = target[1:]
+        else:
+            target = posixpath.join(directory, target)
+        related[rel.get("Id")] = (rel.get("Type"), posixpath.normpath(target))
+    return related
+
+
+def related_parts(package, part_name):
+    """Return ``(type, member name)`` for each internal relationship of a part"""
+    return list(part_relationships(package, part_name).values())
+
+
+def main_document_part(package):
+    """Return the zip member name of the main document part"""
+    for rel_type, target in related_parts(package, ""):
+        if rel_type == OFFICE_DOCUMENT:
+            return target
+    return "word/document.xml"
+
+
+def read_style_names(package, document_part):
+    """Return ``({styleId: name}, default name)`` for the paragraph styles of a document"""
+    names = {}
+    default = None
+    for rel_type, target in related_parts(package, document_part):
+        if rel_type != STYLES:
+            continue
+        try:
+            xml = package.open(target)
+        except KeyError:
+            break
+        with xml:
+            root = None
+            for event, elem in iterparse(xml, events=("start", "end")):
+                if root is None:
+                    root = elem
+                if event != "end" or elem.tag != _STYLE:
+                    continue
+                if elem.get(_TYPE, "paragraph") == "paragraph":
+                    name = elem.find(_NAME)
+                    name = None if name is None else _UI_STYLE_NAMES.get(name.get(_VAL), name.get(_VAL))
+                    names[elem.get(_STYLE_ID)] = name
+                    if elem.get(_DEFAULT) in _ON:
+                        default = name
+                # Styles are top-level children of w:styles
+                root.clear()
+        break
+    return names, default
+
+
+def paragraph_style_id(p):
+    """Style id applied directly to a ``w:p`` element, or None"""
+    pPr = p.find(_PPR)
+    pStyle = None if pPr is None else pPr.find(_PSTYLE)
+    return None if pStyle is None else pStyle.get(_VAL)
+
+
+def list_level(p):
+    """Numbering level of a ``w:p`` element (0 is outermost), or None when it is not numbered
+
+    Works on python-docx's lxml elements as well as on ElementTree ones.
+    """
+    pPr = p.find(_PPR)
+    numPr = None if pPr is None else pPr.find(_NUMPR)
+    if numPr is None:
+        return None
+    numId = numPr.find(_NUMID)
+    # numId 0 removes numbering inherited from the style
+    if numId is not None and numId.get(_VAL) == "0":
+        return None
+    ilvl = numPr.find(_ILVL)
+    return 0 if ilvl is None else int(ilvl.get(_VAL, 0))
+
+
+def run_text(r):
+    """Text of a ``w:r`` element, matching python-docx's ``Run.text``"""
+    parts = []
+    for child in r:
+        tag = child.tag
+        if tag == _T:
+            parts.append(child.text or "")
+        elif tag == _BR:
+            if child.get(_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag in _RUN_TEXT:
+            parts.append(_RUN_TEXT[tag])
+    return "".join(parts)
+
+
+def run_bold(r):
+    """Direct bold state of a ``w:r`` element, matching python-docx's ``Run.bold``"""
+    rPr = r.find(_RPR)
+    if rPr is None:
+        return False
+    b = rPr.find(_B)
+    if b is None:
+        return False
+    return b.get(_VAL, "true") in _ON
+
+
+def read_paragraph(p, style_names=None, default_style=None, container="body"):
+    """Return the Paragraph record for a ``w:p`` element"""
+    runs = []
+    text = []
+    for child in p:
+        if child.tag == _R:
+            run = (run_text(child), run_bold(child))
+            runs.append(run)
+            text.append(run[0])
+        elif child.tag == _HYPERLINK:
+            text.extend(run_text(r) for r in child.iterfind(_R))
+    style = (style_names or {}).get(paragraph_style_id(p), default_style)
+    return Paragraph("".join(text), runs, style, list_level(p), container)
+
+
+_TBL = W + "tbl"
+_SECTPR = W + "sectPr"
+_ID = W + "id"
+_REL_ID = R + "id"
+_FALLBACK = MC + "Fallback"
+# Elements whose paragraphs are in another container than their parent's
+_NESTED = {
+    _TBL: "table",
+    W + "txbxContent": "textbox",
+    W + "sdt": "control",
+    W + "customXml": "control",
+}
+_BODY_STORY = frozenset(["body", "table", "textbox", "control"])
+_NOTE_REFERENCES = {W + "footnoteReference": "footnote", W + "endnoteReference": "endnote"}
+_NOTE_PARTS = {"footnote": (FOOTNOTES, W + "footnote"), "endnote": (ENDNOTES, W + "endnote")}
+_STORY_REFERENCES = {W + "headerReference": "header", W + "footerReference": "footer"}
+# Children that never hold a paragraph, a note reference or section properties
+_LEAVES = frozenset(W + tag for tag in (
+    "rPr", "t", "tab", "ptab", "br", "cr", "noBreakHyphen", "instrText", "fldChar", "lastRenderedPageBreak",
+    "proofErr", "bookmarkStart", "bookmarkEnd", "tblPr", "tblGrid", "trPr", "tcPr", "sdtPr", "sdtEndPr",
+))
+
+
+class StoryWalker:
+    """Reads the paragraphs of the ``containers`` stories of a document, in document order
+
+    ``block(element)`` yields the Paragraph records in and under a body-level
+    element of the main document part. The other stories are read from
+    their parts as the body refers to them: the notes after the paragraph
+    with the reference, each header and footer part once, where the first
+    section properties naming it are. ``relationships`` maps the ids of the
+    main document part's relationships to ``(type, target)``, and
+    ``read_part(target)`` returns the root element of a part (or None).
+
+    Text box content is read from the ``mc:Choice`` of an alternate content
+    element; the ``mc:Fallback`` copy of it is skipped. Works on python-docx's
+    lxml elements as well as on ElementTree ones.
+    """
+
+    def __init__(self, containers, relationships=None, read_part=None, style_names=None, default_style=None):
+        self.containers = get_containers(containers)
+        self.relationships = relationships or {}
+        self.read_part = read_part
+        self.style_names = style_names
+        self.default_style = default_style
+        # container -> {id: note element}, read on the first reference
+        self._notes = {}
+        self._stories_read = set()
+
+    def block(self, element, container="body"):
+        """Yield the Paragraphs in and under ``element``, a paragraph before the text boxes and notes it holds"""
+        tag = element.tag
+        if tag == _P:
+            if container in self.containers:
+                yield read_paragraph(element, self.style_names, self.default_style, container)
+            yield from self._inside(element, container)
+        elif tag in _NOTE_REFERENCES:
+            yield from self._note(_NOTE_REFERENCES[tag], element.get(_ID))
+        elif tag == _SECTPR:
+            yield from self._section_stories(element)
+        elif tag != _FALLBACK:
+            nested = _NESTED.get(tag)
+            if nested is not None and container in _BODY_STORY and (nested != "control" or container == "body"):
+                container = nested
+            yield from self._inside(element, container)
+
+    def _inside(self, element, container):
+        for child in element:
+            tag = child.tag
+            if tag == _R:
+                # Most runs hold nothing but their properties and text
+                for part in child:
+                    if part.tag not in _LEAVES:
+                        yield from self.block(part, container)
+            elif tag == _PPR:
+                sectPr = child.find(_SECTPR)
+                if sectPr is not None:
+                    yield from self._section_stories(sectPr)
+            elif tag not in _LEAVES:
+                yield from self.block(child, container)
+
+    def _part(self, rel_id):
+        """Root element of the part a relationship of the main document part points to, or None"""
+        if rel_id not in self.relationships or self.read_part is None:
+            return None
+        return self.read_part(self.relationships[rel_id][1])
+
+    def _note(self, container, note_id):
+        if container not in self.containers:
+            return
+        notes = self._notes.get(container)
+        if notes is None:
+            rel_type, note_tag = _NOTE_PARTS[container]
+            root = self._part(next((rel_id for rel_id, (type_, _) in self.relationships.items()
+                                    if type_ == rel_type), None))
+            notes = self._notes[container] = {} if root is None else {
+                note.get(_ID): note for note in root.iterfind(note_tag)
+            }
+        note = notes.get(note_id)
+        if note is not None:
+            for child in note:
+                yield from self.block(child, container)
+
+    def _section_stories(self, sectPr):
+        for reference in sectPr:
+            container = _STORY_REFERENCES.get(reference.tag)
+            if container not in self.containers:
+                continue
+            rel_id = reference.get(_REL_ID)
+            target = self.relationships.get(rel_id, (None, None))[1]
+            if target is None or target in self._stories_read:
+                continue
+            self._stories_read.add(target)
+            root = self._part(rel_id)
+            if root is not None:
+                for child in root:
+                    yield from self.block(child, container)
+
+
+def iter_paragraphs(docx_file, profile=NULL_PROFILE, containers=None):
+    """Yield a Paragraph for each paragraph of a .docx file in ``containers`` (see get_containers)
+
+    By default only the direct children of ``w:body`` are reported, which is
+    what python-docx's ``Document.paragraphs`` returns.
+    """
+    containers = get_containers(containers)
+    with profile.stage("zip open"):
+        package = zipfile.ZipFile(docx_file)
+    with package:
+        with profile.stage("zip open"):
+            document_part = main_document_part(package)
+            style_names, default_style = read_style_names(package, document_part)
+        with package.open(document_part) as xml:
+            if containers == BODY_ONLY:
+                yield from iter_body_paragraphs(xml, style_names, default_style)
+                return
+            walker = StoryWalker(containers, part_relationships(package, document_part),
+                                 partial(_read_part, package), style_names, default_style)
+            for block in iter_body_blocks(xml):
+                yield from walker.block(block)
+
+
+def _read_part(package, name):
+    try:
+        with package.open(name) as xml:
+            return parse(xml).getroot()
+    except KeyError:
+        return None
+
+
+def iter_body_blocks(xml):
+    """Yield each direct child element of ``w:body`` in a document.xml file object, once parsed
+
+    The element is dropped when the next one is asked for.
+    """
+    body = None
+    depth = 0
+    for event, elem in iterparse(xml, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == 2 and elem.tag == _BODY:
+                body = elem
+            continue
+        if depth == 3 and body is not None:
+            yield elem
+            # Body-level blocks are finished with once read
+            del body[:]
+        depth -= 1
+
+
+def iter_body_paragraphs(xml, style_names=None, default_style=None):
+    """Yield a Paragraph for each direct ``w:p`` child of ``w:body`` in a document.xml file object"""
+    for block in iter_body_blocks(xml):
+        if block.tag == _P:
+            yield read_paragraph(block, style_names, default_style)
+
+
+# Start and end tags of the elements paragraphs are nested in: table cells
+# (within w:tbl), content controls, custom XML, text boxes and the alternate
+# content text boxes come in. Outside all of them a paragraph is at body level.
+_NESTING_TAG = re.compile(
+    rb"<(/?)(?:w:(?:tbl|sdt|customXml|txbxContent)|mc:AlternateContent)(?=[\s/>])[^>]*?(/?)>"
+)
+_P_END = b"</w:p>"
+_BODY_START = re.compile(rb"<w:body(?:\s[^>]*)?>")
+_W_PREFIX = b'xmlns:w="' + W[1:-1].encode() + b'"'
+
+
+def _nesting(data, start, end):
+    """Nesting elements opened and not closed again between ``start`` and ``end`` of document.xml bytes"""
+    opened = 0
+    for closing, empty in _NESTING_TAG.findall(data, start, end):
+        if closing:
+            opened -= 1
+        elif not empty:
+            opened += 1
+    return opened
+
+
+class BodySlices:
+    """Cuts the body of a .docx into slices of whole body-level blocks, without parsing it
+
+    ``slices(size)`` yields runs of document.xml bytes of about ``size``
+    bytes each, every one ending with a body-level paragraph: a ``</w:p>``
+    after which no table, content control, custom XML, text box or
+    alternate content element is left open. Only the tags of those are
+    looked at, with one regular expression rather than by parsing, and most
+    documents have none. A worker process turns a slice back into the
+    Paragraph records iter_paragraphs would read from it with
+    ``parse_body_slice``. Only documents whose body uses the usual ``w:``
+    prefix can be cut (``sliceable``).
+    """
+
+    def __init__(self, docx_file, read_size=1024 * 1024):
+        self.read_size = read_size
+        self.package = zipfile.ZipFile(docx_file)
+        document_part = main_document_part(self.package)
+        style_names, default_style = read_style_names(self.package, document_part)
+        self.xml = self.package.open(document_part)
+        head = b""
+        while True:
+            chunk = self.xml.read(read_size)
+            head += chunk
+            body = _BODY_START.search(head)
+            if body or not chunk:
+                break
+        self.sliceable = body is not None and _W_PREFIX in head[:body.start()]
+        # What goes before a slice to make it a document.xml of its own
+        self.context = (head[:body.end()] if body else b"", style_names, default_style)
+        self._rest = head[body.end():] if body else b""
+
+    def slices(self, size):
+        buffer = self._rest
+        # Elements left open from the start of the buffer up to ``checked``
+        opened = 0
+        checked = 0
+        eof = False
+        while not eof:
+            chunk = self.xml.read(max(self.read_size, size))
+            eof = not chunk
+            buffer += chunk
+            cut = 0
+            while True:
+                end = buffer.find(_P_END, max(checked, cut + size))
+                if end < 0:
+                    break
+                end += len(_P_END)
+                opened += _nesting(buffer, checked, end)
+                checked = end
+                if not opened:
+                    yield buffer[cut:end]
+                    cut = end
+            # An end tag cut in two by the read is found once the rest of it is read
+            buffer = buffer[cut:]
+            checked -= cut
+        end = buffer.rfind(b"</w:body>")
+        rest = buffer[:end if end >= 0 else len(buffer)]
+        if rest.strip():
+            yield rest
+
+    def close(self):
+        self.xml.close()
+        self.package.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def parse_body_slice(context, data):
+    """Return the Paragraph records of a slice from BodySlices"""
+    head, style_names, default_style = context
+    xml = io.BytesIO(b"".join((head, data, b"</w:body></w:document>")))
+    return list(iter_body_paragraphs(xml, style_names, default_style))
@@ -0,0 +1,341 @@
+"""Structured single-pass extraction of sections, subsections and bold spans.
+
+The original pipeline rendered every paragraph as ``*bold*`` markup and then
+re-parsed those strings with regular expressions to recover sections and
+bold terms. Here each paragraph becomes a small typed record as it is read,
+bold spans come straight from the runs, and text is only rendered (with
+``render``) when it is written out. The rendered lines follow the zfinal.txt
+and zbold.txt formats of the markup pipeline, except that text containing
+asterisks no longer confuses the bold extraction and, by default, runs are
+coalesced first so split bold terms come out whole.
+
+Sections are numbered 1, 2, 3 ... and subsections by a numbering.Numbering:
+a ... z, aa, ab ... by default, so long sections keep their labels, or
+nested levels with their own schemes. Paragraphs from outside the top level
+of the body (tables, text boxes, notes, page headers and footers; see
+docx_stream.CONTAINERS) belong to the subsection they come in and neither
+start sections nor take labels, so the body numbers the same either way.
+
+Records use ``__slots__``; runs are the ``(text, bold)`` pairs of the
+``docx_stream.Paragraph`` records produced by ``pipeline.iter_docx_paragraphs``.
+"""
+import re
+from itertools import groupby
+from operator import itemgetter
+
+from .header_matcher import HeaderMatcher, get_matcher
+from .numbering import get_numbering
+
+# A typed label such as "a. ", "ab. ", "iv. " or "3. " starting a paragraph
+_LABEL = re.compile(r'^([a-z]+|\d+)\.\s+(.*)')
+
+
+def markup_runs(runs):
+    """Render runs as text with bold runs wrapped in asterisks"""
+    return "".join(f"*{text}*" if bold else text for text, bold in runs)
+
+
+def coalesce_runs(runs):
+    """Drop empty runs and merge adjacent runs with the same bold state
+
+    Word splits text into runs for reasons that do not show on the page
+    (spell-check, revision ids, ...), which used to cut bold terms into
+    fragments such as "A" / "rtificial General Intelligence".
+    """
+    return [
+        ("".join(text for text, _ in group), bold)
+        for bold, group in groupby((run for run in runs if run[0]), key=itemgetter(1))
+    ]
+
+
+class Block:
+    """A non-empty paragraph placed in the outline"""
+
+    __slots__ = ("index", "runs", "section")
+
+    def __init__(self, index, runs, section):
+        self.index = index
+        self.runs = runs
+        self.section = section
+
+    # Characters dropped from the start of the paragraph before ``runs``
+    offset = 0
+    # Where the paragraph is, see docx_stream.CONTAINERS
+    container = "body"
+
+    def render(self):
+        return self.format(markup_runs(self.runs))
+
+
+class SectionHeader(Block):
+    """Paragraph matching a header; starts section number ``section``"""
+
+    __slots__ = ()
+
+    def format(self, markup):
+        """The zfinal line of this block, given its runs rendered by markup_runs"""
+        return f"{self.section}. {markup}"
+
+
+class Subsection(Block):
+    """Labelled paragraph inside a section; ``runs`` exclude any typed "x." label
+
+    ``label`` is the subsection id within the section ("b", "ab", or
+    "ab.iii" at ``depth`` 2 of a nested outline).
+    """
+
+    __slots__ = ("label", "depth", "offset")
+
+    def __init__(self, index, runs, section, label, offset=0, depth=1):
+        super().__init__(index, runs, section)
+        self.label = label
+        self.depth = depth
+        self.offset = offset
+
+    def format(self, markup):
+        marker = self.label.rsplit(".", 1)[-1]
+        return f"{'   ' * self.depth}{marker}. {markup}"
+
+
+class BodyText(Block):
+    """Paragraph outside any lettered subsection"""
+
+    __slots__ = ()
+
+    def format(self, markup):
+        return f"      {markup}"
+
+
+class ContainedText(Block):
+    """Paragraph from a table, text box, note, page header or footer, in the current subsection"""
+
+    __slots__ = ("container",)
+
+    def __init__(self, index, runs, section, container):
+        super().__init__(index, runs, section)
+        self.container = container
+
+    def format(self, markup):
+        return f"      [{self.container}] {markup}"
+
+
+class BoldSpan:
+    """A bold term, located by paragraph index and character offsets into the paragraph's runs"""
+
+    __slots__ = ("section", "subsection", "text", "index", "start", "end", "container")
+
+    def __init__(self, section, subsection, text, index, start, end, container="body"):
+        self.section = section
+        self.subsection = subsection
+        self.text = text
+        self.index = index
+        self.start = start
+        self.end = end
+        self.container = container
+
+    @property
+    def section_id(self):
+        return f"{self.section}{self.subsection}"
+
+    def render(self):
+        """zbold line: "1a: term", or "1a: term [table]" for a term outside the top level of the body"""
+        if self.container == "body":
+            return f"{self.section_id}: {self.text}"
+        return f"{self.section_id}: {self.text} [{self.container}]"
+
+
+def run_spans(runs, offset=0):
+    """Return ``(term, start, end)`` for each bold run of a block whose runs start at character ``offset``"""
+    spans = []
+    position = offset
+    for text, bold in runs:
+        if bold:
+            term = text.strip()
+            if term:
+                start = position + len(text) - len(text.lstrip())
+                spans.append((term, start, start + len(term)))
+        position += len(text)
+    return spans
+
+
+def _strip_label(runs, skip):
+    """Drop a typed label of ``skip`` characters and the whitespace after it from the start of the runs
+
+    Returns the remaining runs and the number of characters dropped.
+    """
+    offset = 0
+    stripping = True
+    remaining = []
+    for text, bold in runs:
+        if skip:
+            cut = min(skip, len(text))
+            skip -= cut
+            offset += cut
+            if cut and cut == len(text):
+                continue
+            text = text[cut:]
+        if stripping and not skip:
+            if bold:
+                stripping = False
+            else:
+                content = text.lstrip()
+                offset += len(text) - len(content)
+                text = content
+                stripping = not text
+        remaining.append((text, bold))
+    return remaining, offset
+
+
+class Outline:
+    """Outline and bold-span state carried from one paragraph to the next
+
+    ``place`` does build_outline's work for one paragraph and ``spans``
+    does iter_block_spans' work for one block. ``state`` is a flat tuple of
+    numbers, strings and None that can be stored (as JSON, say) and handed
+    back to ``restore`` to carry on from the same point, which lets
+    revisions reuse the unchanged parts of a document.
+    """
+
+    __slots__ = ("matcher", "coalesce", "numbering", "section_counter", "current_section", "last_kind",
+                 "span_section", "span_subsection", "path")
+
+    def __init__(self, headers=(), coalesce=True, numbering=None):
+        self.matcher = headers if isinstance(headers, HeaderMatcher) else get_matcher(headers)
+        self.coalesce = coalesce
+        self.numbering = get_numbering(numbering)
+        self.restore((0, None, None, None, None))
+
+    def state(self):
+        # The ordinals of the last subsection go last, one per level
+        return (self.section_counter, self.current_section, self.last_kind, self.span_section,
+                self.span_subsection) + self.path
+
+    def restore(self, state):
+        (self.section_counter, self.current_section, self.last_kind, self.span_section,
+         self.span_subsection) = state[:5]
+        self.path = tuple(state[5:])
+
+    def _next_path(self, depth, ordinal=None):
+        """Path of the next subsection at ``depth``, at most one level below the last one"""
+        path = self.path if self.last_kind == "subsection" else ()
+        if ordinal is None:
+            ordinal = path[depth - 1] + 1 if len(path) >= depth else 1
+        return path[:depth - 1] + (ordinal,)
+
+    def start_section(self):
+        """Number the next section, for a paragraph containing a header"""
+        self.section_counter += 1
+        self.current_section = self.section_counter
+        self.last_kind = "header"
+        return self.current_section
+
+    def advance(self, depth, marker=None):
+        """Move past a non-header paragraph at list ``depth`` that may start with a typed ``marker``
+
+        Returns ``(path, labelled)``: the ordinals of the subsection the
+        paragraph starts, or None for body text, and whether the marker was
+        taken as its label (and is to be stripped from its runs).
+        """
+        # A level cannot be skipped: a list item two levels in right after a
+        # header is still a first-level subsection
+        depth = min(depth, len(self.path) + 1 if self.last_kind == "subsection" else 1)
+        path = None
+        labelled = False
+        if marker is not None:
+            ordinal = self.numbering.parse(depth, marker)
+            # Single characters are always labels; longer words ("etc.", "mix.")
+            # only when they are the next label in sequence
+            if ordinal is not None and (len(marker) == 1 or ordinal == self._next_path(depth)[-1]):
+                path = self._next_path(depth, ordinal)
+                labelled = True
+        if path is None and self.current_section and self.last_kind in ("header", "subsection"):
+            path = self._next_path(depth)
+        if path is None:
+            self.last_kind = "body"
+        else:
+            self.last_kind = "subsection"
+            self.path = path
+        return path, labelled
+
+    def place(self, index, paragraph):
+        """Return the Block for paragraph number ``index``, or None when it is empty"""
+        text = paragraph.text.strip()
+        if not text:
+            return None
+        runs = coalesce_runs(paragraph.runs) if self.coalesce else paragraph.runs
+        if paragraph.container != "body":
+            return ContainedText(index, runs, self.current_section, paragraph.container)
+        if text in self.matcher:
+            return SectionHeader(index, runs, self.start_section())
+
+        current_section = self.current_section
+        label_match = _LABEL.match(text)
+        marker = label_match.group(1) if label_match else None
+        path, labelled = self.advance(self.numbering.depth(paragraph), marker)
+        if path is None:
+            return BodyText(index, runs, current_section)
+        offset = 0
+        if labelled:
+            runs, offset = _strip_label(runs, len(marker) + 1)
+        return Subsection(index, runs, current_section, self.numbering.label(path), offset, len(path))
+
+    def span_ids(self, block):
+        """Return the ``(section, subsection)`` the bold terms of ``block`` belong to, or None
+
+        ``block`` must come right after the last block given.
+        """
+        if isinstance(block, SectionHeader):
+            self.span_section = block.section
+            return None
+        if isinstance(block, Subsection):
+            self.span_subsection = block.label
+        if not (self.span_section and self.span_subsection):
+            return None
+        return self.span_section, self.span_subsection
+
+    def spans(self, block):
+        """Return the BoldSpans of ``block``, which must come right after the last block given"""
+        ids = self.span_ids(block)
+        if ids is None:
+            return []
+        section, subsection = ids
+        return [BoldSpan(section, subsection, term, block.index, start, end, block.container)
+                for term, start, end in run_spans(block.runs, block.offset)]
+
+
+def build_outline(paragraphs, headers, coalesce=True, numbering=None):
+    """Yield a Block for each non-empty paragraph of ``paragraphs``
+
+    ``paragraphs`` are Paragraph records and ``headers`` a header list or
+    a compiled HeaderMatcher. A paragraph containing a header starts the next
+    section; the paragraphs after it are labelled a, b, c, ... (or by
+    ``numbering``, a numbering.Numbering or scheme list) unless they carry
+    their own "x." label. With ``coalesce`` the runs of each paragraph go
+    through coalesce_runs first.
+    """
+    place = Outline(headers, coalesce, numbering).place
+    for index, paragraph in enumerate(paragraphs):
+        block = place(index, paragraph)
+        if block is not None:
+            yield block
+
+
+def iter_block_spans(blocks):
+    """Yield ``(block, bold spans)`` for each block, the spans being those iter_bold_spans finds in it
+
+    Lets a caller render each block and write its bold terms as the blocks
+    stream past, without holding the document.
+    """
+    spans = Outline().spans
+    for block in blocks:
+        yield block, spans(block)
+
+
+def iter_bold_spans(blocks):
+    """Yield a BoldSpan for each bold run inside a lettered subsection
+
+    Section header paragraphs are skipped, as are paragraphs before the first
+    section and subsection.
+    """
+    for _, spans in iter_block_spans(blocks):
+        yield from spans
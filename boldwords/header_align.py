@@ -0,0 +1,170 @@
+"""Fuzzy alignment of model headers to the paragraphs they came from.
+
+The model does not always return a header exactly as it appears in the
+document: quotes come back straight instead of curly, trailing punctuation
+is trimmed, casing changes. The outline matches headers by substring, so such
+a header silently starts no section. ``ParagraphIndex`` aligns each header to
+its best paragraph instead, without comparing it with every paragraph:
+
+- paragraph text is normalized (NFKC, case folded, punctuation dropped,
+  whitespace collapsed) and cut into character trigrams, and an inverted
+  index maps each trigram to the paragraphs containing it
+- a header is scored against a paragraph with the Dice coefficient of their
+  trigram sets, ``2 |H & P| / (|H| + |P|)``. Any paragraph scoring at least
+  ``threshold`` shares ``threshold * |H| / (2 - threshold)`` trigrams with
+  the header, so it contains one of the header's rarest
+  ``|H| - that + 1`` trigrams. Only the postings of those are read (prefix
+  filtering), and of the paragraphs in them only those with between
+  ``threshold / (2 - threshold)`` times and the inverse of that as many
+  trigrams as the header are scored (length filtering)
+
+A header that occurs as is anywhere in a paragraph already starts its
+section, so it is left alone: it is looked for in the text of all the
+paragraphs, joined, before any trigram is. Only the other headers are
+aligned, to the start of a paragraph (its first ``PREFIX_CHARS``
+normalized characters), where headers are. ``aligned_headers`` thus only
+rewrites the headers that would have missed; those become the paragraph's
+own text, which the outline then matches::
+
+    index = ParagraphIndex(paragraphs)
+    alignments = index.align_all(headers)
+    process_document(paragraphs, aligned_headers(alignments))
+"""
+import math
+import re
+import unicodedata
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+# Lowest score at which a header is aligned to a paragraph
+ALIGN_THRESHOLD = 0.6
+# Normalized characters of each paragraph that are indexed
+PREFIX_CHARS = 200
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+# Joins the paragraph texts searched for verbatim headers; paragraph text
+# never contains it
+_SEPARATOR = "\0"
+
+# ``index`` and ``text`` (the paragraph's stripped text, or the header itself
+# when it occurs as is) are None when no paragraph reached the threshold;
+# ``score`` is then the best one seen
+Alignment = namedtuple("Alignment", "header index text score")
+
+
+def normalize_text(text):
+    """Comparison form of header and paragraph text: "“Staying Ahead!”" -> "staying ahead" """
+    return _NON_WORD.sub(" ", unicodedata.normalize("NFKC", text).casefold()).strip()
+
+
+def trigrams(normalized):
+    """Set of character trigrams of normalized text, padded so word edges count"""
+    padded = f" {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)} if normalized else set()
+
+
+class ParagraphIndex:
+    """Inverted trigram index over the starts of a document's paragraphs"""
+
+    __slots__ = ("texts", "_normalized", "_sizes", "_postings", "_joined", "_starts", "_indices")
+
+    def __init__(self, paragraphs, prefix_chars=PREFIX_CHARS):
+        paragraphs = list(paragraphs)
+        self.texts = [paragraph.text for paragraph in paragraphs]
+        self._normalized = {}
+        # Trigram count of each indexed paragraph
+        self._sizes = {}
+        postings = {}
+        # Body paragraph texts joined by _SEPARATOR, the offset each starts
+        # at and its paragraph index
+        joined = []
+        self._starts = array("Q")
+        self._indices = array("I")
+        offset = 0
+        for index, paragraph in enumerate(paragraphs):
+            # Only the top level of the body holds section headers
+            if paragraph.container != "body":
+                continue
+            joined.append(paragraph.text)
+            self._starts.append(offset)
+            self._indices.append(index)
+            offset += len(paragraph.text) + len(_SEPARATOR)
+            normalized = normalize_text(paragraph.text)[:prefix_chars]
+            if not normalized:
+                continue
+            grams = trigrams(normalized)
+            self._normalized[index] = normalized
+            self._sizes[index] = len(grams)
+            for gram in grams:
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array("I")
+                posting.append(index)
+        self._postings = postings
+        self._joined = _SEPARATOR.join(joined)
+
+    def find(self, header):
+        """Index of the first paragraph that contains ``header`` as is, or None"""
+        if not header or _SEPARATOR in header:
+            return None
+        offset = self._joined.find(header)
+        if offset < 0:
+            return None
+        return self._indices[bisect_right(self._starts, offset) - 1]
+
+    def candidates(self, grams, threshold):
+        """Paragraphs that could score ``threshold`` or more against a header with trigrams ``grams``"""
+        required = math.ceil(threshold * len(grams) / (2 - threshold))
+        empty = ()
+        rarest = sorted((self._postings.get(gram, empty) for gram in grams), key=len)
+        found = set()
+        for posting in rarest[:len(grams) - max(required, 1) + 1]:
+            found.update(posting)
+        return found
+
+    def align(self, header, threshold=ALIGN_THRESHOLD):
+        """Return the Alignment of one header"""
+        grams = trigrams(normalize_text(header))
+        if not grams:
+            return Alignment(header, None, None, 0.0)
+        stripped = header.strip()
+        index = self.find(stripped)
+        if index is not None:
+            return Alignment(header, index, header, 1.0)
+        smallest = threshold / (2 - threshold) * len(grams)
+        largest = len(grams) / threshold * (2 - threshold) if threshold else math.inf
+        best_index, best_score = None, 0.0
+        for index in sorted(self.candidates(grams, threshold)):
+            if not smallest <= self._sizes[index] <= largest:
+                continue
+            other = trigrams(self._normalized[index])
+            score = 2 * len(grams & other) / (len(grams) + len(other))
+            if score > best_score:
+                best_index, best_score = index, score
+        score = round(best_score, 4)
+        if best_score < threshold:
+            return Alignment(header, None, None, score)
+        return Alignment(header, best_index, self.texts[best_index].strip(), score)
+
+    def align_all(self, headers, threshold=ALIGN_THRESHOLD):
+        return [self.align(header, threshold) for header in headers]
+
+
+def align_headers(paragraphs, headers, threshold=ALIGN_THRESHOLD):
+    """Align ``headers`` to ``paragraphs`` (Paragraph records); returns one Alignment per header"""
+    return ParagraphIndex(paragraphs).align_all(headers, threshold)
+
+
+def aligned_headers(alignments):
+    """Header list for the outline: aligned headers as their paragraph's text, in order, without repeats
+
+    Headers that could not be aligned are kept as they were.
+    """
+    headers = []
+    for alignment in alignments:
+        header = alignment.text or alignment.header
+        if header not in headers:
+            headers.append(header)
+    return headers
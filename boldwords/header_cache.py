@@ -0,0 +1,145 @@
+"""Persistent, content-addressed cache for LLM header identification.
+
+Entries are keyed by a SHA-256 of the model, the prompts and the raw document
+text, so an identical upload gets its headers back without a network call.
+The cache is a single SQLite file: WAL mode and a busy timeout let several
+Streamlit workers read and write it at the same time, and the hit/miss
+counters live in the same file so they add up across workers.
+
+Eviction is LRU. Entries older than ``max_age`` seconds are dropped, and when
+the stored payloads exceed ``max_bytes`` the least recently used ones go first.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_PATH = Path(os.environ.get("BOLDWORDS_CACHE_DIR", Path.home() / ".cache" / "boldwords")) / "headers.sqlite3"
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO counters (name, value) VALUES ('hits', 0), ('misses', 0);
+"""
+
+
+def cache_key(text, prompt, model):
+    """Return the hex digest identifying a (text, prompt, model) request"""
+    digest = hashlib.sha256()
+    for part in (model, prompt, text):
+        encoded = part.encode("utf-8")
+        # Length-prefix each part so ("ab", "c") and ("a", "bc") differ
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class HeaderCache:
+    """On-disk LRU cache mapping cache keys to header lists"""
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._open()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def _connect(self):
+        # One short-lived connection per call keeps the object safe to share
+        # between Streamlit's script threads.
+        return _Transaction(self._open())
+
+    def get(self, key):
+        """Return the cached headers for ``key``, or None on a miss"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.max_age:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'misses'")
+                return None
+            conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+            conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'hits'")
+        return json.loads(row[0])
+
+    def put(self, key, headers):
+        """Store ``headers`` under ``key`` and evict down to the size and age limits"""
+        value = json.dumps(headers, ensure_ascii=False)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM entries WHERE created < ?", (now - self.max_age,))
+        # Keep the most recently used entries whose running size fits
+        conn.execute(
+            """
+            DELETE FROM entries WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS running
+                    FROM entries
+                ) WHERE running > ?
+            )
+            """,
+            (self.max_bytes,),
+        )
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("UPDATE counters SET value = 0")
+
+    def stats(self):
+        """Return hit/miss counts and current size, summed over every process using the file"""
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters"))
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"hits": counters["hits"], "misses": counters["misses"], "entries": entries, "bytes": size}
+
+
+class _Transaction:
+    """Context manager running a block in one IMMEDIATE transaction, then closing the connection"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.conn.close()
@@ -0,0 +1,56 @@
+"""Map-reduce helpers for identifying headers in long documents.
+
+A long document is split into paragraph-aligned chunks that each fit a token
+budget, the chunks are sent to the model concurrently (see
+llm_client.LLMClient.map), and the header lists that come back are merged
+into one list in document order. Headers are whole paragraphs, so a chunk
+boundary never cuts one in half.
+
+Token counts are estimated from the character count, which is close enough
+for English prose to size chunks well inside the model's context window.
+"""
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def chunk_text(text, max_tokens):
+    """Split newline-separated paragraphs into chunks of at most ``max_tokens``
+
+    A single paragraph longer than the budget becomes a chunk of its own.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for paragraph in text.split("\n"):
+        tokens = estimate_tokens(paragraph)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current = []
+            current_tokens = 0
+        current.append(paragraph)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def merge_headers(chunks, results):
+    """Merge per-chunk header lists into one deduplicated list in document order
+
+    Headers are ordered by chunk, then by where they occur in the chunk text;
+    a header the model rephrased (so it is not found) keeps its place after
+    the ones that were found. The first occurrence of a repeated header wins.
+    """
+    merged = []
+    seen = set()
+    for chunk, headers in zip(chunks, results):
+        positions = [(chunk.find(header), i, header) for i, header in enumerate(headers or [])]
+        positions.sort(key=lambda item: (item[0] < 0, item[0], item[1]))
+        for _, _, header in positions:
+            if header not in seen:
+                seen.add(header)
+                merged.append(header)
+    return merged
@@ -0,0 +1,171 @@
+"""Local structural header detection.
+
+Many scripts mark their sections clearly: Heading styles, short bold-only
+paragraphs such as "Closing" or "Car analogy", or an outline list whose top
+level holds the section titles. ``detect_headers`` scores every paragraph
+from those signals and reports how confident it is in the resulting header
+list, so that only documents without a clear structure need the LLM.
+
+Scores are in [0, 1]. A paragraph scoring ``HEADER_SCORE`` or more is taken as
+a header. The document confidence grows with the margin between the weakest
+header and the strongest non-header, and is cut down when many paragraphs
+score close to the cut-off and could go either way. It is zero when fewer
+than two headers are found or when most paragraphs look like headers.
+
+When the model is needed after all, ``select_candidates`` and
+``candidate_lines`` shrink its prompt to the paragraphs that could be
+headers, each tagged with its paragraph index so the answer maps back.
+
+Only paragraphs at the top level of the body are looked at: tables, text
+boxes, notes and page headers and footers (see docx_stream.CONTAINERS)
+never hold a section header.
+"""
+import re
+from collections import Counter
+
+HEADER_SCORE = 0.6
+# Scores this close below the cut-off count as undecided
+AMBIGUOUS_BAND = 0.25
+
+# Signal weights; a paragraph's score is their sum, clamped to [0, 1]
+HEADING_STYLE = 0.9
+TOP_LIST_LEVEL = 0.5
+ALL_BOLD = 0.5
+NUMBERED_TEXT = 0.3
+SHORT = 0.2
+FIRST_PARAGRAPH = 0.1
+LONG = -0.6
+SENTENCE_END = -0.3
+
+SHORT_CHARS = 80
+LONG_CHARS = 150
+
+# Candidate lines sent to the model: paragraphs up to CANDIDATE_CHARS long,
+# each followed by the start of the next paragraph as context
+CANDIDATE_CHARS = 100
+CONTEXT_CHARS = 60
+
+_HEADING_STYLE = re.compile(r'^(Heading [1-9]|Title)$')
+# "1. Intro", "IV) Results" - but not the "a. " subsection labels
+_NUMBERED = re.compile(r'^(\d+|[IVXLC]+)[.)]\s+\S')
+
+
+class Detection:
+    """Headers found in a document, with per-paragraph scores and an overall confidence"""
+
+    __slots__ = ("headers", "indices", "scores", "confidence")
+
+    def __init__(self, headers, indices, scores, confidence):
+        self.headers = headers
+        self.indices = indices
+        self.scores = scores
+        self.confidence = confidence
+
+
+def score_paragraph(paragraph, position, top_level):
+    """Score how header-like a non-empty paragraph is
+
+    ``position`` counts non-empty paragraphs and ``top_level`` is the
+    outermost list level used by the document, or None if it has no list
+    with nested levels.
+    """
+    text = paragraph.text.strip()
+    score = 0.0
+    if paragraph.style and _HEADING_STYLE.match(paragraph.style):
+        score += HEADING_STYLE
+    if top_level is not None and paragraph.level == top_level:
+        score += TOP_LIST_LEVEL
+    visible = [bold for run_text, bold in paragraph.runs if run_text.strip()]
+    if visible and all(visible):
+        score += ALL_BOLD
+    if _NUMBERED.match(text):
+        score += NUMBERED_TEXT
+    if len(text) <= SHORT_CHARS:
+        score += SHORT
+    elif len(text) > LONG_CHARS:
+        score += LONG
+    if text.endswith("."):
+        score += SENTENCE_END
+    if position == 0:
+        score += FIRST_PARAGRAPH
+    return min(1.0, max(0.0, score))
+
+
+def _body_paragraphs(paragraphs):
+    """``(index, paragraph)`` for the non-empty paragraphs at the top level of the body"""
+    return [(i, p) for i, p in enumerate(paragraphs) if p.container == "body" and p.text.strip()]
+
+
+def detect_headers(paragraphs):
+    """Score the paragraphs of a document and return a Detection"""
+    candidates = _body_paragraphs(paragraphs)
+    levels = {p.level for _, p in candidates if p.level is not None}
+    # A list level only separates headers from body text when there are several
+    top_level = min(levels) if len(levels) > 1 else None
+
+    headers = []
+    indices = []
+    scores = []
+    for position, (index, paragraph) in enumerate(candidates):
+        score = score_paragraph(paragraph, position, top_level)
+        scores.append(score)
+        if score >= HEADER_SCORE:
+            headers.append(paragraph.text.strip())
+            indices.append(index)
+
+    return Detection(headers, indices, scores, document_confidence(scores))
+
+
+def document_confidence(scores):
+    """Confidence in [0, 1] that the scores split a document cleanly into headers and body"""
+    header_scores = [s for s in scores if s >= HEADER_SCORE]
+    body_scores = [s for s in scores if s < HEADER_SCORE]
+    if len(header_scores) < 2 or len(header_scores) * 2 > len(scores):
+        return 0.0
+    margin = min(header_scores) - max(body_scores, default=0.0)
+    ambiguous = sum(1 for s in body_scores if s > HEADER_SCORE - AMBIGUOUS_BAND)
+    return round(min(1.0, 0.5 + margin, 1 - ambiguous / len(scores)), 3)
+
+
+def select_candidates(paragraphs):
+    """Return the indices of paragraphs that could be headers
+
+    Candidates are short paragraphs, paragraphs made entirely of bold text,
+    and paragraphs whose style or list level differs from the one most of the
+    document uses (a heading among body text, an unnumbered line in a
+    numbered list, a top-level item among nested ones).
+    """
+    non_empty = _body_paragraphs(paragraphs)
+    if not non_empty:
+        return []
+    usual_style = Counter(p.style for _, p in non_empty).most_common(1)[0][0]
+    usual_level = Counter(p.level for _, p in non_empty).most_common(1)[0][0]
+
+    candidates = []
+    for index, paragraph in non_empty:
+        visible = [bold for run_text, bold in paragraph.runs if run_text.strip()]
+        if (
+            len(paragraph.text.strip()) <= CANDIDATE_CHARS
+            or paragraph.style != usual_style
+            or paragraph.level != usual_level
+            or (visible and all(visible))
+        ):
+            candidates.append(index)
+    return candidates
+
+
+def candidate_lines(paragraphs, indices):
+    """Render candidates one per line as "[index] text | next: start of the next paragraph" """
+    lines = []
+    wanted = set(indices)
+    pending = None
+    for index, paragraph in _body_paragraphs(paragraphs):
+        text = paragraph.text.strip()
+        if pending is not None:
+            context = text[:CONTEXT_CHARS] + ("..." if len(text) > CONTEXT_CHARS else "")
+            lines[-1] += f" | next: {context}"
+            pending = None
+        if index in wanted:
+            lines.append(f"[{index}] {' '.join(text.split())}")
+            pending = index
+    return "\n".join(lines)
@@ -0,0 +1,109 @@
+"""Multi-pattern header matching with an Aho-Corasick automaton.
+
+Header detection used to run ``any(keyword in text for keyword in headers)``
+for every paragraph, which costs one substring search per header. A
+``HeaderMatcher`` is compiled once per header list and then scans each
+paragraph in a single pass, whatever the number of headers.
+
+The semantics are those of the keyword loop: a paragraph matches when any
+header occurs in it, and ``first_match`` returns the header that comes first in
+the list (not the one that occurs first in the text).
+
+The automaton walks the text one character at a time in Python, while each
+``keyword in text`` test runs in C. For short lists the plain scan is faster
+(see bench_header_matcher.py), so lists below ``AUTOMATON_MIN_HEADERS`` keep
+using it behind the same interface.
+"""
+from functools import lru_cache
+
+_NO_MATCH = float("inf")
+
+# Header count from which the automaton beats one substring search per header
+AUTOMATON_MIN_HEADERS = 100
+
+
+class HeaderMatcher:
+    """Compiled automaton for one list of headers"""
+
+    __slots__ = ("headers", "_delta", "_best", "_empty")
+
+    def __init__(self, headers, min_headers=AUTOMATON_MIN_HEADERS):
+        self.headers = tuple(headers)
+        self._delta = None
+        if len(self.headers) < min_headers:
+            return
+
+        goto = [{}]
+        best = [_NO_MATCH]
+        # An empty header is contained in every text
+        self._empty = min((i for i, h in enumerate(self.headers) if not h), default=_NO_MATCH)
+
+        for index, header in enumerate(self.headers):
+            if not header:
+                continue
+            state = 0
+            for ch in header:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    best.append(_NO_MATCH)
+                state = nxt
+            best[state] = min(best[state], index)
+
+        # Breadth-first pass computing failure links. Each state's transition
+        # table is completed with the non-root moves of its failure state, so
+        # scanning needs one dict lookup per character and no fail-chain walk.
+        fail = [0] * len(goto)
+        delta = [dict(edges) for edges in goto]
+        queue = list(goto[0].values())
+        for state in queue:
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                best[nxt] = min(best[nxt], best[fail[nxt]])
+            for ch, nxt in delta[fail[state]].items():
+                delta[state].setdefault(ch, nxt)
+
+        self._delta = delta
+        self._best = best
+
+    def index(self, text):
+        """Return the list index of the first header contained in ``text``, or -1"""
+        if self._delta is None:
+            for i, keyword in enumerate(self.headers):
+                if keyword in text:
+                    return i
+            return -1
+        found = self._empty
+        if found == 0:
+            return 0
+        delta = self._delta
+        best = self._best
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if best[state] < found:
+                found = best[state]
+                if found == 0:
+                    break
+        return -1 if found == _NO_MATCH else found
+
+    def first_match(self, text):
+        """Return the first header (in list order) contained in ``text``, or None"""
+        found = self.index(text)
+        return None if found < 0 else self.headers[found]
+
+    def __contains__(self, text):
+        return self.index(text) >= 0
+
+
+@lru_cache(maxsize=32)
+def _compile(headers):
+    return HeaderMatcher(headers)
+
+
+def get_matcher(headers):
+    """Return a compiled matcher for ``headers``, reused across calls with the same list"""
+    return _compile(tuple(headers))
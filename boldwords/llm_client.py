@@ -0,0 +1,122 @@
+"""Async client for the header identification model.
+
+``LLMClient`` wraps ``openai.ChatCompletion.acreate`` with what the blocking
+calls lacked:
+
+- a per-request timeout covering the whole request, response body included
+- retries of transient failures (timeouts, dropped connections, 429 and 5xx
+  answers) with jittered exponential backoff; anything else, such as a bad
+  key or an invalid request, fails at once
+- a cap on the number of requests in flight
+- one aiohttp session for all requests made inside ``async with client``, so
+  connections are reused instead of opened per request
+
+Point ``OPENAI_API_BASE`` (or ``api_base``) at ``boldwords.llm_standin`` to
+run the whole pipeline without the real API.
+"""
+import asyncio
+import random
+import time
+
+import aiohttp
+import openai
+
+# HTTP statuses worth another attempt
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def is_retryable(exc):
+    """True when ``exc`` is a transient failure that may succeed if retried"""
+    if isinstance(exc, (asyncio.TimeoutError, openai.error.Timeout, openai.error.APIConnectionError,
+                        openai.error.TryAgain)):
+        return True
+    return isinstance(exc, openai.error.OpenAIError) and exc.http_status in RETRY_STATUSES
+
+
+def backoff_delay(attempt, base, cap):
+    """Seconds to wait before retry ``attempt`` (0-based): full jitter up to ``base * 2**attempt``"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class LLMClient:
+    """Chat completions with timeouts, retries, a concurrency cap and connection reuse
+
+    Use inside ``async with``; the session and the concurrency cap belong to
+    the event loop that entered it.
+    """
+
+    def __init__(self, model, timeout=30.0, max_retries=3, concurrency=4,
+                 backoff=0.5, max_backoff=8.0, api_base=None, api_key=None):
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.concurrency = concurrency
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.api_base = api_base
+        self.api_key = api_key
+        # Requests made, and retries among them
+        self.requests = 0
+        self.retries = 0
+        self._session = None
+        self._session_token = None
+        self._slots = None
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.concurrency))
+        # openai's async calls pick up this session instead of opening their own
+        self._session_token = openai.aiosession.set(self._session)
+        self._slots = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        openai.aiosession.reset(self._session_token)
+        await self._session.close()
+        self._session = self._session_token = self._slots = None
+
+    async def _create(self, messages, params):
+        return await openai.ChatCompletion.acreate(
+            model=self.model,
+            messages=messages,
+            request_timeout=self.timeout,
+            api_base=self.api_base,
+            api_key=self.api_key,
+            **params,
+        )
+
+    async def chat(self, messages, log=None, **params):
+        """Return the text of the model's answer to ``messages``; raises once retries run out
+
+        ``params`` are passed on to the API (temperature, max_tokens, ...).
+        ``log`` receives a message for each failed attempt.
+        """
+        async with self._slots:
+            attempt = 0
+            while True:
+                self.requests += 1
+                started = time.perf_counter()
+                try:
+                    response = await asyncio.wait_for(self._create(messages, params), self.timeout)
+                    return response.choices[0].message["content"].strip()
+                except Exception as e:
+                    if isinstance(e, asyncio.TimeoutError):
+                        e = openai.error.Timeout(f"Request timed out after {self.timeout}s")
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        raise e
+                    delay = backoff_delay(attempt, self.backoff, self.max_backoff)
+                    if log:
+                        log(f"Attempt {attempt + 1} failed after {time.perf_counter() - started:.2f}s "
+                            f"({type(e).__name__}: {getattr(e, 'user_message', e)}); retrying in {delay:.2f}s")
+                    attempt += 1
+                    self.retries += 1
+                    await asyncio.sleep(delay)
+
+    async def map(self, fn, items):
+        """Await ``fn(item)`` for every item concurrently
+
+        Returns one ``(result, exception)`` pair per item, in order, so a
+        failing item does not lose the others; the concurrency cap applies
+        to ``chat``.
+        """
+        results = await asyncio.gather(*(fn(item) for item in items), return_exceptions=True)
+        return [(None, r) if isinstance(r, Exception) else (r, None) for r in results]
@@ -0,0 +1,158 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Serves ``POST /v1/chat/completions`` in the format the openai package expects
+and answers header requests the way the real model is asked to: a JSON array
+of header lines, or of bracketed paragraph numbers when the prompt is made of
+candidate lines (see header_detect.candidate_lines). Headers are guessed from
+the line text alone, so answers are plausible rather than right.
+
+Latency, errors and hung requests can be injected to exercise the client's
+timeouts and retries or to load-test the pipeline::
+
+    python -m boldwords.llm_standin --port 8765 --latency 0.5 --jitter 0.2 --error-rate 0.1
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1 API=test streamlit run streamlit_app/app.py
+
+``GET /stats`` reports the requests served, errors injected and the largest
+number of requests in flight at once.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+
+from aiohttp import web
+
+_CANDIDATE = re.compile(r'^\[(\d+)\]\s*(.*?)(?:\s+\| next: .*)?$')
+
+
+def looks_like_header(line):
+    line = line.strip()
+    return bool(line) and len(line) <= 80 and not line.endswith((".", ",", ";", ":", "?"))
+
+
+def answer(prompt):
+    """Return the JSON array answer for a header request, or a greeting for anything else"""
+    # The document text follows the instructions after the first blank line
+    _, _, text = prompt.partition("\n\n")
+    if not text:
+        return "Hello"
+    lines = text.split("\n")
+    candidates = [_CANDIDATE.match(line) for line in lines]
+    if any(candidates):
+        return json.dumps([int(m.group(1)) for m in candidates if m and looks_like_header(m.group(2))])
+    return json.dumps([line.strip() for line in lines if looks_like_header(line)])
+
+
+class StandIn:
+    """Request handler state: injected behaviour and counters"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, hang_rate=0.0, hang=60.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang = hang
+        self.requests = 0
+        self.errors = 0
+        self.hangs = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def chat_completions(self, request):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            body = await request.json()
+            roll = random.random()
+            if roll < self.hang_rate:
+                self.hangs += 1
+                await asyncio.sleep(self.hang)
+            await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+            if roll >= 1 - self.error_rate:
+                self.errors += 1
+                status = random.choice((429, 500, 503))
+                return web.json_response(
+                    {"error": {"message": f"Injected {status}", "type": "server_error"}}, status=status
+                )
+
+            prompt = body["messages"][-1]["content"]
+            content = answer(prompt)
+            return web.json_response({
+                "id": f"chatcmpl-standin-{self.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "standin"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": len(prompt) // 4,
+                    "completion_tokens": len(content) // 4,
+                    "total_tokens": (len(prompt) + len(content)) // 4,
+                },
+            })
+        finally:
+            self.in_flight -= 1
+
+    async def stats(self, request):
+        return web.json_response({
+            "requests": self.requests,
+            "errors": self.errors,
+            "hangs": self.hangs,
+            "max_in_flight": self.max_in_flight,
+        })
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_get("/stats", self.stats)
+        return app
+
+
+def serve_in_thread(standin, host="127.0.0.1", port=0):
+    """Run ``standin`` on a background thread; returns (api_base, stop function)
+
+    ``port`` 0 picks a free port.
+    """
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(standin.app())
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, host, port)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    return f"http://{host}:{port}/v1", stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the OpenAI chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each answer")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds added to the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 429/500/503")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Share of requests that stall for --hang seconds")
+    parser.add_argument("--hang", type=float, default=60.0)
+    args = parser.parse_args()
+
+    standin = StandIn(args.latency, args.jitter, args.error_rate, args.hang_rate, args.hang)
+    print(f"Serving on http://{args.host}:{args.port}/v1")
+    web.run_app(standin.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Numbering schemes for the subsection levels of the outline.
+
+Positions in the outline are plain integers: the section number, then one
+ordinal (1 based) per subsection level. A ``Numbering`` turns those into the
+labels that appear in zfinal.txt and zbold.txt, and parses labels typed at
+the start of a paragraph back into ordinals. The schemes are
+
+- alpha: a ... z, aa, ab ... az, ba ... zz, aaa ... (spreadsheet columns)
+- roman: i, ii, iii, iv ...
+- decimal: 1, 2, 3 ...
+
+The default is a single alpha level, the classic "1a", "1b" outline. Giving
+more schemes nests the outline: a paragraph at list level ``n`` (see
+Paragraph.level) goes one level deeper for each level, down to the last
+scheme, and the id of a nested subsection joins the labels of its levels
+with dots (``12ab.iii`` is section 12, subsection 28, item 3). decimal is
+meant for nested levels: as the first level, "11" could be section 1,
+subsection 1 or section 11.
+"""
+import re
+
+_ROMAN = (
+    (1000, "m"), (900, "cm"), (500, "d"), (400, "cd"), (100, "c"), (90, "xc"),
+    (50, "l"), (40, "xl"), (10, "x"), (9, "ix"), (5, "v"), (4, "iv"), (1, "i"),
+)
+_ROMAN_PATTERN = re.compile(r"^m*(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})$")
+
+
+def alpha_label(n):
+    """1 -> "a", 26 -> "z", 27 -> "aa", 702 -> "zz", 703 -> "aaa" """
+    label = ""
+    while n > 0:
+        n, remainder = divmod(n - 1, 26)
+        label = chr(ord("a") + remainder) + label
+    return label
+
+
+def parse_alpha(label):
+    n = 0
+    for char in label:
+        if not "a" <= char <= "z":
+            return None
+        n = n * 26 + ord(char) - ord("a") + 1
+    return n or None
+
+
+def roman_label(n):
+    """1 -> "i", 4 -> "iv", 1987 -> "mcmlxxxvii" (past 3999 the "m"s just repeat)"""
+    label = ""
+    for value, numeral in _ROMAN:
+        count, n = divmod(n, value)
+        label += numeral * count
+    return label
+
+
+def parse_roman(label):
+    # Only canonical numerals: "iiii" and "vx" are not labels
+    if not label or not _ROMAN_PATTERN.match(label):
+        return None
+    n = 0
+    for value, numeral in _ROMAN:
+        while label.startswith(numeral):
+            n += value
+            label = label[len(numeral):]
+    return n or None
+
+
+def parse_decimal(label):
+    return int(label) if label.isdigit() and int(label) > 0 else None
+
+
+SCHEMES = {
+    "alpha": (alpha_label, parse_alpha),
+    "roman": (roman_label, parse_roman),
+    "decimal": (str, parse_decimal),
+}
+
+
+class Numbering:
+    """Label schemes for subsection levels 1, 2, ...; more than one scheme nests the outline"""
+
+    __slots__ = ("schemes", "_formats", "_parsers", "_labels")
+
+    def __init__(self, schemes=("alpha",)):
+        if isinstance(schemes, str):
+            schemes = [scheme.strip() for scheme in schemes.split(",")]
+        unknown = [scheme for scheme in schemes if scheme not in SCHEMES]
+        if unknown or not schemes:
+            raise ValueError(f"Unknown numbering scheme {', '.join(unknown) or '(none)'}; "
+                             f"expected a comma-separated list of {', '.join(SCHEMES)}")
+        self.schemes = tuple(schemes)
+        self._formats = [SCHEMES[scheme][0] for scheme in self.schemes]
+        self._parsers = [SCHEMES[scheme][1] for scheme in self.schemes]
+        # path -> label; every section reuses the same few
+        self._labels = {}
+
+    def __eq__(self, other):
+        return isinstance(other, Numbering) and self.schemes == other.schemes
+
+    def __hash__(self):
+        return hash(self.schemes)
+
+    def __str__(self):
+        return ",".join(self.schemes)
+
+    @property
+    def nested(self):
+        return len(self.schemes) > 1
+
+    def depth(self, paragraph):
+        """Subsection level (1 based) of a paragraph: 1 unless nested, else from its list level"""
+        if not self.nested or not paragraph.level:
+            return 1
+        return min(paragraph.level + 1, len(self.schemes))
+
+    def marker(self, depth, ordinal):
+        """Label of one level, as typed before the paragraph: "ab", "iii" """
+        return self._formats[depth - 1](ordinal)
+
+    def label(self, path):
+        """Subsection id for a path of ordinals: (28,) -> "ab", (28, 3) -> "ab.iii" """
+        label = self._labels.get(path)
+        if label is None:
+            label = self._labels[path] = ".".join(self._formats[depth](ordinal)
+                                                  for depth, ordinal in enumerate(path))
+        return label
+
+    def parse(self, depth, marker):
+        """Ordinal of a typed label at subsection level ``depth``, or None when it is not one"""
+        return self._parsers[depth - 1](marker)
+
+
+DEFAULT_NUMBERING = Numbering()
+
+
+def get_numbering(numbering):
+    """A Numbering from None (the default), a Numbering or a scheme list/"alpha,roman" string"""
+    if numbering is None:
+        return DEFAULT_NUMBERING
+    if isinstance(numbering, Numbering):
+        return numbering
+    return Numbering(numbering)
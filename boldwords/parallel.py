@@ -0,0 +1,174 @@
+"""Two-phase extraction of one very large document on a pool of processes.
+
+Numbering sections and subsections is sequential: whether a paragraph is
+subsection "c" or body text depends on every paragraph before it. Most of
+the work per paragraph is not: parsing it, coalescing its runs, matching it
+against the headers, recognising and stripping a typed label, rendering its
+markup and finding its bold spans. ``iter_extract`` therefore
+
+1. cuts the document into contiguous chunks of paragraphs and prepares each
+   chunk in a worker process, without knowing what came before it
+   (``prepare_slice``, ``prepare_chunk``)
+2. runs the outline's state machine (Outline.start_section and
+   Outline.advance) over the prepared paragraphs in document order, in the
+   parent, which is left with choosing between the prepared renderings,
+   formatting the line prefix and attaching section ids to the spans
+   (``resolve``)
+
+With the stream engine the chunks are docx_stream.BodySlices slices of
+document.xml, found without parsing it, so the workers parse too; the
+python-docx engine loads the document in the parent and sends the workers
+its paragraphs. So does the stream engine when more than the top level of
+the body is read, as the other stories come in where the body refers to
+them. Chunks are handed out as they are cut and at most two per worker are
+in flight, so memory does not grow with the document.
+
+The output is that of pipeline.iter_extract, line for line and span for
+span. ``boldwords big.docx ... -j 8`` uses it; bench_parallel.py measures it.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from . import docx_stream
+from .extraction import (_LABEL, BodyText, BoldSpan, ContainedText, Outline, SectionHeader, Subsection,
+                         _strip_label, coalesce_runs, markup_runs, run_spans)
+from .header_matcher import get_matcher
+from .numbering import get_numbering
+from .profiling import NULL_PROFILE
+
+# Bytes of document.xml per stream engine chunk, paragraphs per python-docx chunk
+SLICE_BYTES = 1024 * 1024
+CHUNK_PARAGRAPHS = 5000
+
+
+def prepare_chunk(paragraphs, headers, coalesce=True, numbering=None):
+    """Worker: phase one for consecutive paragraphs
+
+    Returns ``(paragraph count, records)``, with one record per non-empty
+    paragraph: ``(index in the chunk, header, depth, marker, markup, spans,
+    labelled markup, labelled spans, container)``, spans being run_spans
+    tuples. ``marker`` is the typed label the paragraph starts with, if any,
+    and the labelled markup and spans are those of its runs once that label
+    is stripped (None without one).
+    """
+    matcher = get_matcher(headers)
+    numbering = get_numbering(numbering)
+    records = []
+    for index, paragraph in enumerate(paragraphs):
+        text = paragraph.text.strip()
+        if not text:
+            continue
+        runs = coalesce_runs(paragraph.runs) if coalesce else paragraph.runs
+        if paragraph.container != "body":
+            records.append((index, False, 0, None, markup_runs(runs), run_spans(runs), None, None,
+                            paragraph.container))
+            continue
+        if text in matcher:
+            records.append((index, True, 0, None, markup_runs(runs), None, None, None, "body"))
+            continue
+        label_match = _LABEL.match(text)
+        marker = label_match.group(1) if label_match else None
+        labelled_markup = labelled_spans = None
+        if marker is not None:
+            labelled_runs, offset = _strip_label(runs, len(marker) + 1)
+            labelled_markup, labelled_spans = markup_runs(labelled_runs), run_spans(labelled_runs, offset)
+        records.append((index, False, numbering.depth(paragraph), marker, markup_runs(runs), run_spans(runs),
+                        labelled_markup, labelled_spans, "body"))
+    return len(paragraphs), records
+
+
+def prepare_slice(data, context, headers, coalesce=True, numbering=None):
+    """Worker: phase one for a docx_stream.BodySlices slice, parsed here rather than in the parent"""
+    return prepare_chunk(docx_stream.parse_body_slice(context, data), headers, coalesce, numbering)
+
+
+def resolve(chunks, numbering=None):
+    """Phase two: yield ``(zfinal line, bold spans)`` for prepared chunks, which must come in document order"""
+    outline = Outline(numbering=numbering)
+    label = outline.numbering.label
+    first = 0
+    for count, records in chunks:
+        for index, header, depth, marker, markup, spans, labelled_markup, labelled_spans, container in records:
+            index += first
+            if container != "body":
+                block = ContainedText(index, None, outline.current_section, container)
+            elif header:
+                block = SectionHeader(index, None, outline.start_section())
+            else:
+                current_section = outline.current_section
+                path, labelled = outline.advance(depth, marker)
+                if labelled:
+                    markup, spans = labelled_markup, labelled_spans
+                if path is None:
+                    block = BodyText(index, None, current_section)
+                else:
+                    block = Subsection(index, None, current_section, label(path), 0, len(path))
+            ids = outline.span_ids(block)
+            if ids is None or not spans:
+                yield block.format(markup), []
+            else:
+                section, subsection = ids
+                yield block.format(markup), [BoldSpan(section, subsection, term, index, start, end, container)
+                                             for term, start, end in spans]
+        first += count
+
+
+def _chunks(paragraphs, size):
+    """Yield lists of ``size`` consecutive paragraphs (the last one may be shorter)"""
+    chunk = []
+    for paragraph in paragraphs:
+        chunk.append(paragraph)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _tasks(docx_file, headers, engine, coalesce, numbering, profile, containers=None):
+    """Yield ``(worker function, *args)`` for each chunk of a document, in order"""
+    headers = list(headers)
+    numbering = str(numbering)
+    containers = docx_stream.get_containers(containers)
+    if engine == "stream" and containers == docx_stream.BODY_ONLY:
+        with profile.stage("zip open"):
+            slices = docx_stream.BodySlices(docx_file)
+        with slices:
+            if slices.sliceable:
+                for data in profile.iterate("xml scan", slices.slices(SLICE_BYTES)):
+                    yield prepare_slice, data, slices.context, headers, coalesce, numbering
+                return
+    from .pipeline import iter_docx_paragraphs
+
+    paragraphs = profile.iterate("xml parse", iter_docx_paragraphs(docx_file, engine, profile, containers))
+    for chunk in _chunks(paragraphs, CHUNK_PARAGRAPHS):
+        yield prepare_chunk, chunk, headers, coalesce, numbering
+
+
+def _prepared(tasks, jobs, profile):
+    """Yield the results of ``tasks`` in order, running them on ``jobs`` processes"""
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(*task))
+            if len(pending) < 2 * jobs:
+                continue
+            with profile.stage("parallel wait"):
+                result = pending.popleft().result()
+            yield result
+        while pending:
+            with profile.stage("parallel wait"):
+                result = pending.popleft().result()
+            yield result
+
+
+def iter_extract(docx_file, headers, engine="docx", jobs=2, coalesce=True, profile=NULL_PROFILE, numbering=None,
+                 containers=None):
+    """Yield ``(zfinal line, bold spans)`` for each non-empty paragraph, as pipeline.iter_extract does
+
+    The paragraphs are prepared on ``jobs`` worker processes.
+    """
+    numbering = get_numbering(numbering)
+    tasks = _tasks(docx_file, headers, engine, coalesce, numbering, profile, containers)
+    chunks = _prepared(tasks, jobs, profile)
+    return profile.iterate("numbering", resolve(chunks, numbering))
@@ -0,0 +1,277 @@
+"""The extraction pipeline: .docx paragraphs to zfinal lines and bold terms.
+
+python-docx is only imported when the docx engine first reads a document.
+"""
+import os
+import re
+import sys
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+from xml.etree.ElementTree import fromstring
+
+from . import docx_stream
+from .extraction import build_outline, iter_block_spans
+from .profiling import NULL_PROFILE
+from .records import document_id
+
+ENGINES = ("docx", "stream")
+
+def iter_extract(docx_file, headers, engine="docx", profile=NULL_PROFILE, numbering=None, jobs=None,
+                 containers=None):
+    """Yield ``(zfinal line, bold spans)`` for each non-empty paragraph, as the document is read
+    
+    Nothing is kept once yielded, so with the stream engine memory use does
+    not grow with the document (python-docx loads the whole document first).
+    ``numbering`` labels the subsections (see numbering.Numbering; default
+    a ... z, aa, ab ...). With ``jobs`` above 1 the paragraphs are prepared
+    on that many worker processes (see parallel), with the same output.
+    ``containers`` picks the paragraphs read (see docx_stream.get_containers;
+    default: the top level of the body).
+    """
+    if jobs and jobs > 1:
+        from . import parallel
+        return parallel.iter_extract(docx_file, headers, engine, jobs, profile=profile, numbering=numbering,
+                                     containers=containers)
+    paragraphs = profile.iterate("xml parse", iter_docx_paragraphs(docx_file, engine, profile, containers))
+    blocks = profile.iterate("header matching", build_outline(paragraphs, headers, numbering=numbering))
+    block_spans = profile.iterate("bold extraction", iter_block_spans(blocks))
+    return profile.iterate("markup", ((block.render(), spans) for block, spans in block_spans))
+
+def extract(docx_file, headers, engine="docx", profile=NULL_PROFILE, numbering=None, jobs=None, containers=None):
+    """Return the zfinal lines and the BoldSpans of one document"""
+    formatted_text = []
+    extracted_words = []
+    for line, spans in iter_extract(docx_file, headers, engine, profile, numbering, jobs, containers):
+        formatted_text.append(line)
+        extracted_words.extend(spans)
+    return formatted_text, extracted_words
+
+@contextmanager
+def open_output(path):
+    """Open ``path`` for writing, or use stdout when it is "-"
+    
+    A file is written under a temporary name in the same directory and only
+    replaces ``path`` once the block completes, so a document that fails
+    leaves no empty or partial output behind. The new file gets the mode
+    (and, where allowed, the owner) of the file it replaces, or the mode a
+    plain ``open`` would give it; a symbolic link is kept and its target
+    replaced. Paths that are not regular files (/dev/null, a named pipe)
+    are written directly.
+    """
+    if path == "-":
+        yield sys.stdout
+        sys.stdout.flush()
+        return
+    path = os.path.realpath(path)
+    if os.path.exists(path) and not os.path.isfile(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            yield f
+        return
+    directory, name = os.path.split(path)
+    fd, temporary = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+    try:
+        with open(fd, 'w', encoding='utf-8') as f:
+            yield f
+        _copy_file_mode(path, temporary)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+def _copy_file_mode(path, temporary):
+    """Give ``temporary`` the mode and owner of ``path``, or the umask's default mode when there is none"""
+    try:
+        existing = os.stat(path)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temporary, 0o666 & ~umask)
+        return
+    os.chmod(temporary, existing.st_mode & 0o7777)
+    try:
+        os.chown(temporary, existing.st_uid, existing.st_gid)
+    except PermissionError:
+        pass
+
+def write_extraction(items, formatted_output_file, bold_words_output_file, profile=NULL_PROFILE, terms=None,
+                     document=None):
+    """Write ``(line, spans)`` items to the zfinal and zbold outputs as they arrive
+    
+    Either output may be "-" for stdout. When ``terms`` (a records.TermWriter)
+    is given, the spans are also appended to it as records of ``document``,
+    once the whole document has been read so a failed extraction leaves no
+    partial records behind. Returns a Counter of bold terms per section.
+    """
+    section_counts = Counter()
+    document_spans = []
+    with open_output(formatted_output_file) as formatted, open_output(bold_words_output_file) as bold:
+        with profile.stage("output write"):
+            separator = ''
+            for line, spans in items:
+                formatted.write(separator + line)
+                separator = '\n'
+                for span in spans:
+                    bold.write(span.render() + '\n')
+                    section_counts[span.section] += 1
+                if terms is not None:
+                    document_spans.extend(spans)
+            # zfinal.txt has no trailing newline, but a pipe reader wants its last line
+            if formatted_output_file == "-" and separator:
+                formatted.write('\n')
+    if document_spans:
+        terms.write(document, document_spans)
+    return section_counts
+
+def extract_to_files(docx_file, formatted_output_file, bold_words_output_file, headers, engine="docx",
+                     profile=NULL_PROFILE, terms=None, numbering=None, jobs=None, containers=None):
+    """Write the formatted text and bold words of one document; return a Counter of bold terms per section
+    
+    ``terms`` is an optional records.TermWriter the bold terms are appended to.
+    """
+    items = iter_extract(docx_file, headers, engine, profile, numbering, jobs, containers)
+    return write_extraction(items, formatted_output_file, bold_words_output_file, profile, terms,
+                            document_id(docx_file))
+
+def process_document(docx_file, formatted_output_file, bold_words_output_file, headers, engine="docx",
+                     profile=NULL_PROFILE, terms=None, numbering=None, jobs=None, containers=None):
+    # Keep stdout clean for the extraction output when it is streamed there
+    status = sys.stderr if "-" in (formatted_output_file, bold_words_output_file) else sys.stdout
+    try:
+        print(f"Processing document: {docx_file} (engine: {engine})", file=status)
+        
+        section_counts = extract_to_files(docx_file, formatted_output_file, bold_words_output_file, headers, engine,
+                                          profile, terms, numbering, jobs, containers)
+        bold_count = sum(section_counts.values())
+        
+        print(f"Successfully converted document to formatted text", file=status)
+        print(f"Formatted text saved to {output_name(formatted_output_file)}", file=status)
+        print(f"Successfully extracted {bold_count} bold words", file=status)
+        print(f"Bold words saved to {output_name(bold_words_output_file)}", file=status)
+        if terms is not None:
+            print(f"Term records appended to {terms.path} ({terms.format})", file=status)
+        
+        if section_counts:
+            print("\nDistribution by section:", file=status)
+            for section, count in sorted(section_counts.items()):
+                print(f"Section {section}: {count} words", file=status)
+        
+        return True
+        
+    except Exception as e:
+        if isinstance(e, BrokenPipeError) and "-" in (formatted_output_file, bold_words_output_file):
+            # The reader of stdout stopped early (``| head``), which is not an
+            # error; point stdout at devnull so flushing it at exit does not fail
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return True
+        print(f"Error processing document: {e}", file=status)
+        import traceback
+        traceback.print_exc()
+        return False
+
+def output_name(path):
+    return "stdout" if path == "-" else path
+
+def iter_docx_paragraphs(docx_file, engine="docx", profile=NULL_PROFILE, containers=None):
+    """Yield a docx_stream.Paragraph (text, runs, style, level, container) for each paragraph in ``containers``
+    
+    Only the top level of the body by default (see docx_stream.get_containers).
+    """
+    containers = docx_stream.get_containers(containers)
+    if engine == "stream":
+        yield from docx_stream.iter_paragraphs(docx_file, profile, containers)
+        return
+    if engine != "docx":
+        raise ValueError(f"Unknown engine '{engine}', expected one of {', '.join(ENGINES)}")
+    
+    from docx import Document
+    
+    # python-docx parses every part of the package while opening it
+    with profile.stage("zip open"):
+        doc = Document(docx_file)
+    style_names, default_style = _style_names(doc)
+    if containers != docx_stream.BODY_ONLY:
+        yield from _walk_docx(doc, containers, style_names, default_style)
+        return
+    for para in doc.paragraphs:
+        yield docx_stream.Paragraph(
+            para.text,
+            [(run.text, bool(run.bold)) for run in para.runs],
+            style_names.get(docx_stream.paragraph_style_id(para._p), default_style),
+            docx_stream.list_level(para._p),
+        )
+
+def _style_names(doc):
+    """Return ``({styleId: name}, default name)`` for the paragraph styles of a python-docx Document
+    
+    ``Paragraph.style`` searches every style of the document for each
+    paragraph; this is the same lookup done once.
+    """
+    from docx.enum.style import WD_STYLE_TYPE
+    
+    names = {style.style_id: style.name for style in doc.styles if style.type == WD_STYLE_TYPE.PARAGRAPH}
+    default = doc.styles.default(WD_STYLE_TYPE.PARAGRAPH)
+    return names, None if default is None else default.name
+
+def _walk_docx(doc, containers, style_names, default_style):
+    """Paragraphs in ``containers`` of a python-docx Document, walking its element trees once"""
+    relationships = {rel_id: (rel.reltype, rel.target_part)
+                     for rel_id, rel in doc.part.rels.items() if not rel.is_external}
+    walker = docx_stream.StoryWalker(containers, relationships, _part_element, style_names, default_style)
+    for block in doc.element.body:
+        yield from walker.block(block)
+
+def _part_element(part):
+    # python-docx has no part class for footnotes and endnotes, only their bytes
+    element = getattr(part, "element", None)
+    return fromstring(part.blob) if element is None else element
+
+def read_paragraphs(docx_file, engine="docx", profile=NULL_PROFILE, containers=None):
+    """Parse a .docx path or file object once into a list of Paragraph records"""
+    return list(profile.iterate("xml parse", iter_docx_paragraphs(docx_file, engine, profile, containers)))
+
+def convert_docx_to_text(docx_file, headers, engine="docx", numbering=None, jobs=None, containers=None):
+    if jobs and jobs > 1:
+        return [line for line, _ in iter_extract(docx_file, headers, engine, numbering=numbering, jobs=jobs,
+                                                 containers=containers)]
+    paragraphs = iter_docx_paragraphs(docx_file, engine, containers=containers)
+    return [block.render() for block in build_outline(paragraphs, headers, numbering=numbering)]
+
+def extract_bold_words(formatted_text):
+    """Re-extract "1a: term" entries from already rendered zfinal lines"""
+    extracted_words = []
+    
+    current_section = None
+    current_subsection = None
+    # Labels of the current subsection's levels, nested ones being indented further
+    markers = []
+    
+    for line in formatted_text:
+        if not line.strip():
+            continue
+        
+        section_match = re.match(r'^(\d+)\.\s+', line)
+        if section_match:
+            current_section = section_match.group(1)
+            continue
+        
+        subsection_match = re.match(r'^((?:   )+)([a-z]+|\d+)\.\s+', line)
+        if subsection_match:
+            depth = len(subsection_match.group(1)) // 3
+            markers = markers[:depth - 1] + [subsection_match.group(2)]
+            current_subsection = ".".join(markers)
+        
+        if current_section and current_subsection:
+            bold_matches = re.findall(r'\*(.*?)\*', line)
+            # "      [table] ..." lines come from outside the top level of the body
+            container_match = re.match(r'^\s+(\[[a-z]+\]) ', line)
+            
+            for bold_word in bold_matches:
+                if bold_word.strip():
+                    section_id = f"{current_section}{current_subsection}"
+                    entry = f"{section_id}: {bold_word.strip()}"
+                    if container_match:
+                        entry += f" {container_match.group(1)}"
+                    extracted_words.append(entry)
+    
+    return extracted_words
@@ -0,0 +1,104 @@
+"""Per-stage wall-time accounting for the extraction pipeline.
+
+A ``Profile`` adds up the time spent in named stages. Stages nest, and each
+stage is charged only its own (exclusive) time, so time spent in an inner
+stage is not counted again in the outer one. The pipeline is lazy - the
+outline pulls paragraphs from the reader as it goes - so the stages of a
+generator chain are measured with ``iterate``, which times each step of an
+iterator as a stage of its own.
+
+Functions take ``profile=NULL_PROFILE``. The null profile's ``stage`` is a
+shared no-op context manager and its ``iterate`` hands the iterator back
+unchanged, so an unprofiled run pays a few calls per document and nothing
+per paragraph.
+
+Stage names used by the pipeline, in order: "zip open", "xml parse",
+"raw text", "header detection", "llm call", "header matching", "markup",
+"bold extraction", "output write". With the docx engine python-docx parses
+the whole package when it opens it, so its "zip open" includes the XML parse
+and "xml parse" only covers reading the parsed objects.
+
+In the two-phase mode for one document on several processes (see parallel)
+parsing, "header matching", "bold extraction" and "markup" happen in the
+workers. The parent reports "xml scan", cutting document.xml into slices
+(or "xml parse" with the docx engine), "parallel wait", the time spent
+waiting for the workers, and "numbering", the serial pass over their results.
+"""
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class Profile:
+    """Exclusive wall time and call count per stage, in first-seen order"""
+
+    def __init__(self):
+        # name -> [seconds, calls]
+        self.stages = {}
+        # Time spent in nested stages, per open stage
+        self._children = []
+
+    @contextmanager
+    def stage(self, name):
+        self._children.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += elapsed
+            self.add(name, elapsed - children)
+
+    def iterate(self, name, iterable):
+        """Yield from ``iterable``, charging the time to produce each item to ``name``"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def add(self, name, seconds, calls=1):
+        entry = self.stages.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += calls
+
+    def merge(self, stages):
+        """Add the ``stages`` of another profile (e.g. one returned by a worker process)"""
+        for name, (seconds, calls) in stages.items():
+            self.add(name, seconds, calls)
+
+    def rows(self):
+        """Return ``(stage, calls, seconds, share of the total)`` per stage"""
+        total = sum(seconds for seconds, _ in self.stages.values()) or 1.0
+        return [(name, calls, seconds, seconds / total) for name, (seconds, calls) in self.stages.items()]
+
+    def report(self):
+        """Render the stages as a text table"""
+        lines = [f"{'stage':<18} {'calls':>8} {'time (ms)':>11} {'share':>7}"]
+        for name, calls, seconds, share in self.rows():
+            lines.append(f"{name:<18} {calls:>8} {seconds * 1000:>11.2f} {share:>7.1%}")
+        total = sum(seconds for seconds, _ in self.stages.values())
+        lines.append(f"{'total':<18} {'':>8} {total * 1000:>11.2f}")
+        return "\n".join(lines)
+
+
+class _NullProfile:
+    """Profile that records nothing"""
+
+    _nothing = nullcontext()
+
+    def stage(self, name):
+        return self._nothing
+
+    def iterate(self, name, iterable):
+        return iterable
+
+    def add(self, name, seconds, calls=1):
+        pass
+
+
+NULL_PROFILE = _NullProfile()
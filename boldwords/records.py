@@ -0,0 +1,190 @@
+"""Bold terms as records: JSON Lines, CSV and Parquet datasets.
+
+zbold.txt's ``1a: term`` lines are meant for reading; analytics wants one
+row per term with the columns of ``COLUMNS``:
+
+- document: the document id, its file name without the .docx suffix
+- section, subsection, section_id: as in zbold.txt (``1``, ``a``, ``1a``)
+- term: the bold text
+- paragraph: index of the paragraph among those read (0 based), which are the
+  top-level body paragraphs unless more containers are read
+- start, end: character offsets of the term in the text of the paragraph's
+  runs, typed subsection label included
+- container: where the paragraph is (``body``, ``table``, ``footnote`` ...,
+  see docx_stream.CONTAINERS)
+
+Every writer appends. JSON Lines and CSV files are opened for appending (CSV
+gets its header row only when the file is new), and a Parquet dataset is a
+directory to which each run adds one ``part-*.parquet`` file, so existing
+data is never rewritten; pyarrow, pandas or DuckDB read the directory as one
+table. Parquet needs pyarrow, which is only imported when it is written.
+"""
+import csv
+import importlib.util
+import io
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+COLUMNS = ("document", "section", "subsection", "section_id", "term", "paragraph", "start", "end", "container")
+FORMATS = ("jsonl", "csv", "parquet")
+
+_SUFFIXES = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv", ".parquet": "parquet"}
+
+
+def document_id(docx_file):
+    """The document column for a .docx path"""
+    return Path(docx_file).stem
+
+
+def parquet_available():
+    """True when pyarrow is installed, so Parquet can be written"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def span_rows(document, spans):
+    """Yield a record tuple, in COLUMNS order, for each BoldSpan of ``document``"""
+    for span in spans:
+        yield (document, span.section, span.subsection, span.section_id, span.text, span.index, span.start,
+               span.end, span.container)
+
+
+def format_for(path):
+    """The output format implied by a path's suffix; a path without one is a Parquet dataset"""
+    suffix = Path(path).suffix.lower()
+    if suffix in _SUFFIXES:
+        return _SUFFIXES[suffix]
+    if not suffix:
+        return "parquet"
+    raise ValueError(f"Cannot tell the format of '{path}'; use one of {', '.join(FORMATS)}")
+
+
+class JsonLinesWriter:
+    """One JSON object per term, on a text file object"""
+
+    def __init__(self, file):
+        self.file = file
+
+    def write_rows(self, rows):
+        write = self.file.write
+        for row in rows:
+            write(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n")
+
+    def close(self):
+        pass
+
+
+class CsvWriter:
+    """One CSV row per term, on a text file object opened with ``newline=""``"""
+
+    def __init__(self, file, header=True):
+        self.writer = csv.writer(file)
+        if header:
+            self.writer.writerow(COLUMNS)
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    """Terms as Parquet row groups of up to ``row_group_size`` rows, on a path or binary file object"""
+
+    def __init__(self, where, row_group_size=65536):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.schema = pa.schema([
+            ("document", pa.string()),
+            ("section", pa.int32()),
+            ("subsection", pa.string()),
+            ("section_id", pa.string()),
+            ("term", pa.string()),
+            ("paragraph", pa.int64()),
+            ("start", pa.int32()),
+            ("end", pa.int32()),
+            ("container", pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(where, self.schema)
+        self.row_group_size = row_group_size
+        self.pending = []
+
+    def write_rows(self, rows):
+        self.pending.extend(rows)
+        if len(self.pending) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            columns = list(zip(*self.pending))
+            self.writer.write_table(self._pa.Table.from_arrays(
+                [self._pa.array(column, field.type) for column, field in zip(columns, self.schema)],
+                schema=self.schema,
+            ))
+            self.pending = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+class TermWriter:
+    """Appends term records to a JSON Lines file, CSV file or Parquet dataset directory
+
+    Used as a context manager; ``write(document, spans)`` takes the BoldSpans
+    of a document as they are extracted.
+    """
+
+    def __init__(self, path, fmt=None):
+        self.path = Path(path)
+        self.format = fmt or format_for(path)
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown term format '{self.format}', expected one of {', '.join(FORMATS)}")
+        self.file = None
+        self.rows = 0
+        if self.format == "parquet":
+            self.path.mkdir(parents=True, exist_ok=True)
+            name = f"part-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+            self.writer = ParquetWriter(str(self.path / name))
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        new = not self.path.exists() or os.path.getsize(self.path) == 0
+        self.file = open(self.path, "a", encoding="utf-8", newline="")
+        self.writer = JsonLinesWriter(self.file) if self.format == "jsonl" else CsvWriter(self.file, header=new)
+
+    def write(self, document, spans):
+        self.write_rows(list(span_rows(document, spans)))
+
+    def write_rows(self, rows):
+        self.writer.write_rows(rows)
+        self.rows += len(rows)
+
+    def close(self):
+        self.writer.close()
+        if self.file is not None:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def render_rows(rows, fmt):
+    """Return the records ``rows`` as one in-memory JSON Lines, CSV or Parquet file (bytes)"""
+    if fmt == "parquet":
+        buffer = io.BytesIO()
+        writer = ParquetWriter(buffer)
+        writer.write_rows(rows)
+        writer.close()
+        return buffer.getvalue()
+    text = io.StringIO(newline="")
+    writer = JsonLinesWriter(text) if fmt == "jsonl" else CsvWriter(text)
+    writer.write_rows(rows)
+    return text.getvalue().encode("utf-8")
@@ -0,0 +1,174 @@
+"""Incremental re-extraction of revised documents.
+
+Writers upload new revisions of the same script many times a day, changing
+a few paragraphs each time. ``reextract`` keeps per-document state between
+uploads - a content hash of every paragraph, the outline state before it and
+its rendered output - and on the next revision:
+
+- lines the new paragraphs up with the old ones by hash (difflib), so
+  inserted and deleted paragraphs only disturb their own neighbourhood
+- reuses the output of an unchanged paragraph when the outline arrives at it
+  in the same state as last time; otherwise (a dirty region, or everything
+  after an inserted header, which renumbers the later sections) the
+  paragraph is placed again
+- keeps the previous headers unless an inserted, changed or deleted
+  paragraph is header-like: a header-identification candidate (see
+  header_detect.select_candidates) or one of the headers. Only then is
+  ``identify_headers`` called, which is where the LLM request happens.
+  A previous state made with other header settings (how identify_headers
+  chooses them) is not used at all.
+
+States are JSON and live in a ``RevisionStore``, keyed by document name
+within a scope (a user or session, see ``document_key``).
+"""
+import hashlib
+import json
+from difflib import SequenceMatcher
+from pathlib import Path
+
+from .extraction import BoldSpan, Outline
+from .header_cache import DEFAULT_PATH, HeaderCache
+from .header_detect import select_candidates
+from .header_matcher import get_matcher
+from .numbering import get_numbering
+
+STATE_VERSION = 3
+
+
+def paragraph_hash(paragraph):
+    """Digest of everything about a paragraph that can change its output"""
+    data = json.dumps([paragraph.text, paragraph.runs, paragraph.style, paragraph.level, paragraph.container],
+                      ensure_ascii=False)
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class RevisionStore(HeaderCache):
+    """On-disk LRU store of revision states, keyed by document name"""
+
+    def __init__(self, path=DEFAULT_PATH.with_name("revisions.sqlite3"), max_bytes=64 * 1024 * 1024, **options):
+        super().__init__(path, max_bytes, **options)
+
+
+class Revision:
+    """Result of extracting one revision"""
+
+    __slots__ = ("headers", "lines", "spans", "state", "reused", "placed", "headers_reused")
+
+    def __init__(self, headers, lines, spans, state, reused, placed, headers_reused):
+        self.headers = headers
+        # zfinal lines and BoldSpans, as pipeline.extract would return them
+        self.lines = lines
+        self.spans = spans
+        self.state = state
+        # Non-empty paragraphs whose output was reused / placed again
+        self.reused = reused
+        self.placed = placed
+        # False when identify_headers was called
+        self.headers_reused = headers_reused
+
+
+def _header_like(paragraphs, hashes, headers):
+    """Hashes of the paragraphs that are header candidates or contain a header"""
+    matcher = get_matcher(headers)
+    like = {hashes[i] for i in select_candidates(paragraphs)}
+    like.update(h for h, p in zip(hashes, paragraphs) if p.container == "body" and p.text.strip() in matcher)
+    return like
+
+
+def reextract(paragraphs, identify_headers, previous=None, coalesce=True, numbering=None, header_settings=None):
+    """Extract ``paragraphs`` (a list of Paragraph records), reusing ``previous`` state where possible
+
+    ``identify_headers(paragraphs)`` returns the header list; it is only
+    called when there is no usable previous state or a header-like paragraph
+    changed. ``header_settings`` (any JSON value) describes how it chooses
+    them, so that changing them re-identifies the headers. Returns a Revision
+    whose ``state`` is to be stored for the next revision.
+    """
+    numbering = get_numbering(numbering)
+    hashes = [paragraph_hash(p) for p in paragraphs]
+    # Settings go through JSON in the stored state: compare them the same way
+    header_settings = json.loads(json.dumps(header_settings))
+    if previous is not None and (previous.get("version") != STATE_VERSION
+                                 or previous.get("header_settings") != header_settings):
+        previous = None
+
+    # New paragraph index -> old index, for paragraphs the diff keeps
+    same = {}
+    dirty = True
+    if previous is not None:
+        old_hashes = previous["hashes"]
+        opcodes = SequenceMatcher(None, old_hashes, hashes, autojunk=False).get_opcodes()
+        changed_old = set()
+        changed_new = set()
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == "equal":
+                same.update(zip(range(j1, j2), range(i1, i2)))
+            else:
+                changed_old.update(old_hashes[i1:i2])
+                changed_new.update(hashes[j1:j2])
+        old_like = set(previous["header_like"])
+        new_like = _header_like(paragraphs, hashes, previous["headers"])
+        dirty = bool(changed_old & old_like or changed_new & new_like)
+
+    if dirty:
+        headers = list(identify_headers(paragraphs))
+        headers_reused = False
+    else:
+        headers = previous["headers"]
+        headers_reused = True
+    if previous is not None and (headers != previous["headers"] or coalesce != previous["coalesce"]
+                                 or str(numbering) != previous["numbering"]):
+        # Every paragraph may fall in a different section, or render differently
+        same = {}
+
+    outline = Outline(headers, coalesce, numbering)
+    states = []
+    outputs = []
+    lines = []
+    spans = []
+    reused = placed = 0
+    for index, paragraph in enumerate(paragraphs):
+        state = outline.state()
+        states.append(state)
+        old = same.get(index)
+        if old is not None and tuple(previous["states"][old]) == state:
+            output = previous["outputs"][old]
+            outline.restore(tuple(previous["states"][old + 1]))
+            if output is not None:
+                reused += 1
+        else:
+            block = outline.place(index, paragraph)
+            if block is None:
+                output = None
+            else:
+                placed += 1
+                output = [block.render(), [[s.section, s.subsection, s.text, s.start, s.end, s.container]
+                                           for s in outline.spans(block)]]
+        outputs.append(output)
+        if output is not None:
+            lines.append(output[0])
+            spans.extend(BoldSpan(section, subsection, text, index, start, end, container)
+                         for section, subsection, text, start, end, container in output[1])
+    states.append(outline.state())
+
+    state = {
+        "version": STATE_VERSION,
+        "headers": headers,
+        "coalesce": coalesce,
+        "numbering": str(numbering),
+        "header_settings": header_settings,
+        "hashes": hashes,
+        "header_like": sorted(_header_like(paragraphs, hashes, headers)),
+        "states": states,
+        "outputs": outputs,
+    }
+    return Revision(headers, lines, spans, state, reused, placed, headers_reused)
+
+
+def document_key(name, scope=None):
+    """Store key for a document, from its file name and the scope (user, session) it belongs to
+
+    Without a scope, every document of the same name shares its state.
+    """
+    name = Path(name).name
+    return f"revision:{name}" if scope is None else f"revision:{scope}:{name}"
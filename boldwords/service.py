@@ -0,0 +1,273 @@
+"""Headless HTTP extraction service.
+
+``POST /extract`` takes one .docx as the request body, or several as the
+``file`` parts of a multipart/form-data upload, and answers with JSON: the
+headers used, and the bold terms grouped by section and subsection. Headers
+come from the ``header`` query parameters (repeatable) or ``header`` form
+fields; without them they are detected from the document structure (see
+header_detect), and the detection confidence is reported. ``engine`` picks
+the paragraph reader, ``numbering`` the subsection labels and ``containers``
+the parts of the document read, as on the command line; the default engine,
+stream, never reads embedded media. Uploads are spooled to temporary files
+as they arrive, so the service holds neither them nor their media in memory.
+
+Extraction runs on a pool of worker processes. At most ``workers``
+documents are extracted at once and ``queue`` more may wait; a request that
+would go past that is turned away with 503 and a Retry-After header, so a
+load balancer can send it elsewhere. ``GET /health`` reports the pool and
+queue, and turns 503 while the queue is full; ``GET /metrics`` gives
+Prometheus-style counters.
+
+    python -m boldwords.service --port 8080 --workers 4 --queue 16
+    curl --data-binary @script.docx 'localhost:8080/extract?header=Intro&header=Closing'
+    curl -F file=@a.docx -F file=@b.docx localhost:8080/extract
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from aiohttp import web
+
+from .docx_stream import get_containers
+from .pipeline import ENGINES, read_paragraphs
+from .extraction import SectionHeader, build_outline, iter_block_spans
+from .header_detect import detect_headers
+from .numbering import Numbering
+
+DEFAULT_MAX_UPLOAD = 512 * 1024 * 1024
+RETRY_AFTER = 1
+CHUNK_SIZE = 1024 * 1024
+
+
+def extract_document(path, headers, engine="stream", numbering=None, containers=None):
+    """Worker: extract one .docx file; returns the JSON-ready result"""
+    start = time.perf_counter()
+    paragraphs = read_paragraphs(path, engine, containers=containers)
+    result = {}
+    if headers:
+        result["header_source"] = "request"
+    else:
+        detection = detect_headers(paragraphs)
+        headers = detection.headers
+        result["header_source"] = "detected"
+        result["confidence"] = detection.confidence
+
+    sections = []
+    subsections = {}
+    bold_count = 0
+    for block, spans in iter_block_spans(build_outline(paragraphs, headers, numbering=numbering)):
+        if isinstance(block, SectionHeader):
+            sections.append({
+                "number": block.section,
+                "header": "".join(text for text, _ in block.runs).strip(),
+                "subsections": [],
+            })
+            subsections = {}
+        for span in spans:
+            subsection = subsections.get(span.subsection)
+            if subsection is None:
+                subsection = subsections[span.subsection] = {"label": span.subsection, "terms": []}
+                sections[-1]["subsections"].append(subsection)
+            subsection["terms"].append(span.text)
+            bold_count += 1
+
+    result.update({
+        "headers": list(headers),
+        "bold_count": bold_count,
+        "sections": sections,
+        "seconds": round(time.perf_counter() - start, 4),
+    })
+    return result
+
+
+class ExtractionService:
+    """Request handlers, the worker pool and the counters behind /health and /metrics"""
+
+    def __init__(self, workers=None, queue=None, engine="stream", max_upload=DEFAULT_MAX_UPLOAD):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue = self.workers * 4 if queue is None else queue
+        self.engine = engine
+        self.max_upload = max_upload
+        self.pool = None
+        self._slots = None
+        # Documents being extracted or waiting for a worker
+        self.pending = 0
+        self.running = 0
+        self.counters = {
+            "requests_total": 0,
+            "rejected_total": 0,
+            "documents_total": 0,
+            "document_failures_total": 0,
+            "extraction_seconds_total": 0.0,
+        }
+
+    async def start(self, app):
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._slots = asyncio.Semaphore(self.workers)
+
+    async def stop(self, app):
+        self.pool.shutdown(wait=True)
+
+    def full(self):
+        return self.pending >= self.workers + self.queue
+
+    async def _run(self, path, headers, engine, numbering, containers):
+        async with self._slots:
+            self.running += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.pool, extract_document, path, headers, engine,
+                                                  numbering, containers)
+            finally:
+                self.running -= 1
+
+    async def _extract(self, name, path, headers, engine, numbering, containers):
+        """Extract one admitted document; failures become an "error" entry"""
+        try:
+            result = await self._run(path, headers, engine, numbering, containers)
+            self.counters["extraction_seconds_total"] += result["seconds"]
+            return {"name": name, **result}
+        except Exception as e:
+            self.counters["document_failures_total"] += 1
+            return {"name": name, "error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.pending -= 1
+            self.counters["documents_total"] += 1
+
+    async def spool(self, read_chunk, directory, received):
+        """Copy an upload, read with ``await read_chunk(size)``, to a file in ``directory``
+
+        Returns (path, size), or None for an empty upload. ``received`` is the
+        size of the uploads already spooled for this request.
+        """
+        fd, path = tempfile.mkstemp(suffix=".docx", dir=directory)
+        size = 0
+        with os.fdopen(fd, "wb") as file:
+            while True:
+                chunk = await read_chunk(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if received + size > self.max_upload:
+                    raise web.HTTPRequestEntityTooLarge(max_size=self.max_upload, actual_size=received + size)
+                file.write(chunk)
+        return (path, size) if size else None
+
+    async def read_upload(self, request, directory):
+        """Spool the documents of a raw or multipart request body into ``directory``
+
+        Returns ([(name, path)], form headers); an empty upload has no path.
+        """
+        if request.content_type != "multipart/form-data":
+            spooled = await self.spool(request.content.read, directory, 0)
+            return [(request.query.get("name", "document.docx"), spooled and spooled[0])], []
+        documents = []
+        headers = []
+        received = 0
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name == "file":
+                spooled = await self.spool(part.read_chunk, directory, received)
+                received += spooled[1] if spooled else 0
+                documents.append((part.filename or f"document-{len(documents) + 1}.docx", spooled and spooled[0]))
+            elif part.name == "header":
+                headers.append(await part.text())
+        return documents, headers
+
+    async def extract(self, request):
+        self.counters["requests_total"] += 1
+        # Turn the request away before reading the upload when there is no room
+        if self.full():
+            return self.reject()
+        engine = request.query.get("engine", self.engine)
+        if engine not in ENGINES:
+            raise web.HTTPBadRequest(text=f"Unknown engine '{engine}', expected one of {', '.join(ENGINES)}")
+        try:
+            numbering = Numbering(request.query.get("numbering", "alpha"))
+            containers = get_containers(request.query.get("containers", "body"))
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=str(e))
+
+        directory = tempfile.mkdtemp(prefix="boldwords-")
+        try:
+            documents, form_headers = await self.read_upload(request, directory)
+            if not documents or not all(path for _, path in documents):
+                raise web.HTTPBadRequest(text="No .docx upload found in the request")
+            if self.pending + len(documents) > self.workers + self.queue:
+                return self.reject()
+            headers = request.query.getall("header", []) + form_headers
+
+            self.pending += len(documents)
+            results = await asyncio.gather(*(self._extract(name, path, headers, engine, numbering, containers)
+                                             for name, path in documents))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        if request.content_type != "multipart/form-data":
+            result = results[0]
+            return web.json_response(result, status=422 if "error" in result else 200)
+        return web.json_response({"documents": results})
+
+    def reject(self):
+        self.counters["rejected_total"] += 1
+        return web.json_response(
+            {"error": "Extraction queue is full, try again later"},
+            status=503,
+            headers={"Retry-After": str(RETRY_AFTER)},
+        )
+
+    def status(self):
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queued": self.pending - self.running,
+            "queue_limit": self.queue,
+        }
+
+    async def health(self, request):
+        full = self.full()
+        return web.json_response({"status": "busy" if full else "ok", **self.status()}, status=503 if full else 200)
+
+    async def metrics(self, request):
+        status = self.status()
+        lines = []
+        for name, value in self.counters.items():
+            lines.append(f"# TYPE boldwords_{name} counter")
+            lines.append(f"boldwords_{name} {value}")
+        for name in ("workers", "running", "queued", "queue_limit"):
+            lines.append(f"# TYPE boldwords_{name} gauge")
+            lines.append(f"boldwords_{name} {status[name]}")
+        return web.Response(text="\n".join(lines) + "\n", content_type="text/plain")
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/extract", self.extract)
+        app.router.add_get("/health", self.health)
+        app.router.add_get("/metrics", self.metrics)
+        app.on_startup.append(self.start)
+        app.on_cleanup.append(self.stop)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve bold-term extraction over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="worker processes (default: number of CPUs)")
+    parser.add_argument("--queue", type=int, default=None,
+                        help="documents that may wait for a worker before requests get 503 (default: 4 per worker)")
+    parser.add_argument("--engine", choices=ENGINES, default="stream", help="default paragraph reader")
+    parser.add_argument("--max-upload", type=int, default=DEFAULT_MAX_UPLOAD, help="largest request body in bytes")
+    args = parser.parse_args()
+
+    service = ExtractionService(args.workers, args.queue, args.engine, args.max_upload)
+    print(f"Serving on http://{args.host}:{args.port} with {service.workers} workers, queue {service.queue}")
+    web.run_app(service.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
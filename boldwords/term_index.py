@@ -0,0 +1,250 @@
+"""Persistent inverted index of bold terms across many documents.
+
+Answers "which scripts and sections emphasise *reinforcement learning*?"
+without re-running the extractor: each normalized term maps to postings of
+(document, section_id, count). Documents are added from zbold output (the
+``1a: term`` entries of extract_bold_words, or BoldSpans) and can be
+re-added or removed one at a time; re-adding replaces the document's
+postings. The ``[table]``, ``[footnote]`` ... tag of a term from outside the
+top level of the body is not part of the term.
+
+The index is one SQLite file, opened like the header cache (WAL, one short
+transaction per call). Postings are clustered on the term, so exact and
+prefix lookups are a single index range scan::
+
+    boldwords-index add out/                  # every *.zbold.txt in out/
+    boldwords-index query "reinforcement learning"
+    boldwords-index query reinforce --prefix
+    boldwords-index remove script-v1
+
+Terms are normalized with NFKC, case folding, collapsed whitespace and
+surrounding punctuation stripped, so "*Reinforcement  Learning:*" and
+"reinforcement learning" are the same term.
+"""
+import argparse
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+from collections import Counter, namedtuple
+from pathlib import Path
+
+from .docx_stream import CONTAINERS
+from .header_cache import DEFAULT_PATH, _Transaction
+
+DEFAULT_INDEX_PATH = DEFAULT_PATH.with_name("terms.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    terms INTEGER NOT NULL,
+    added REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    document INTEGER NOT NULL,
+    section_id TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (term, document, section_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_document ON postings (document);
+"""
+
+_ENTRY = re.compile(r"^\s*(\d+[a-z0-9]+(?:\.[a-z0-9]+)*):\s?(.*?)(?: \[(?:%s)\])?$" % "|".join(CONTAINERS))
+_SPACE = re.compile(r"\s+")
+# Highest code point, so every term starting with a prefix sorts below prefix + _TOP
+_TOP = "\U0010ffff"
+
+# A term's occurrences in one section of one document
+Posting = namedtuple("Posting", "term document section_id count")
+
+
+def normalize_term(text):
+    """The index form of a bold term"""
+    text = _SPACE.sub(" ", unicodedata.normalize("NFKC", text).casefold())
+    return text.strip(" .,;:!?\"'()[]{}*‘’“”")
+
+
+def parse_entry(line):
+    """Return ``(section_id, term)`` for a "1a: term" line (zbold.txt, extract_bold_words), or None"""
+    match = _ENTRY.match(line)
+    if match and match.group(2).strip():
+        return match.group(1), match.group(2)
+    return None
+
+
+def bold_file_document(path):
+    """Document name for a zbold file: ``out/script.zbold.txt`` is ``script``"""
+    name = Path(path).name
+    for suffix in (".zbold.txt", ".txt"):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+class TermIndex:
+    """On-disk inverted index of bold terms: normalized term -> (document, section_id, count)"""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._open()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def _connect(self):
+        return _Transaction(self._open())
+
+    def add(self, document, entries):
+        """Index the bold terms of ``document``, replacing any earlier version of it
+
+        ``entries`` are "1a: term" strings or BoldSpans. Returns the number of
+        term occurrences indexed.
+        """
+        counts = Counter()
+        for entry in entries:
+            if isinstance(entry, str):
+                parsed = parse_entry(entry)
+                if parsed is None:
+                    continue
+                section_id, text = parsed
+            else:
+                section_id, text = entry.section_id, entry.text
+            term = normalize_term(text)
+            if term:
+                counts[term, section_id] += 1
+        total = sum(counts.values())
+        with self._connect() as conn:
+            self._remove(conn, document)
+            document_id = conn.execute(
+                "INSERT INTO documents (name, terms, added) VALUES (?, ?, ?)", (document, total, time.time())
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO postings (term, document, section_id, count) VALUES (?, ?, ?, ?)",
+                ((term, document_id, section_id, count) for (term, section_id), count in counts.items()),
+            )
+        return total
+
+    def add_bold_file(self, path, document=None):
+        """Index a zbold file; the document name defaults to the file's (see bold_file_document)"""
+        with open(path, encoding="utf-8") as f:
+            return self.add(document or bold_file_document(path), f)
+
+    def _remove(self, conn, document):
+        row = conn.execute("SELECT id FROM documents WHERE name = ?", (document,)).fetchone()
+        if row is None:
+            return False
+        conn.execute("DELETE FROM postings WHERE document = ?", row)
+        conn.execute("DELETE FROM documents WHERE id = ?", row)
+        return True
+
+    def remove(self, document):
+        """Drop a document from the index; returns False when it was not indexed"""
+        with self._connect() as conn:
+            return self._remove(conn, document)
+
+    def lookup(self, term, prefix=False, limit=None):
+        """Return the Postings of ``term`` (or of every term starting with it), most frequent first"""
+        term = normalize_term(term)
+        if not term:
+            return []
+        if prefix:
+            where, args = "p.term >= ? AND p.term < ?", (term, term + _TOP)
+        else:
+            where, args = "p.term = ?", (term,)
+        query = (
+            "SELECT p.term, d.name, p.section_id, p.count FROM postings p JOIN documents d ON d.id = p.document "
+            f"WHERE {where} ORDER BY p.count DESC, d.name, p.section_id"
+        )
+        if limit is not None:
+            query += " LIMIT ?"
+            args += (limit,)
+        conn = self._open()
+        try:
+            return [Posting(*row) for row in conn.execute(query, args)]
+        finally:
+            conn.close()
+
+    def documents(self):
+        """Return ``{document: term occurrences}`` for every indexed document"""
+        conn = self._open()
+        try:
+            return dict(conn.execute("SELECT name, terms FROM documents ORDER BY name"))
+        finally:
+            conn.close()
+
+    def stats(self):
+        conn = self._open()
+        try:
+            documents, occurrences = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(terms), 0) FROM documents"
+            ).fetchone()
+            terms, postings = conn.execute("SELECT COUNT(DISTINCT term), COUNT(*) FROM postings").fetchone()
+        finally:
+            conn.close()
+        return {"documents": documents, "occurrences": occurrences, "terms": terms, "postings": postings}
+
+
+def find_bold_files(paths):
+    """Expand directories to the zbold files in them"""
+    for path in map(Path, paths):
+        if path.is_dir():
+            yield from sorted(p for p in path.glob("*.txt") if p.name.endswith("zbold.txt"))
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inverted index of bold terms across processed documents")
+    parser.add_argument("--index", default=str(DEFAULT_INDEX_PATH),
+                        help="index file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="index zbold files, replacing earlier versions of the same documents")
+    add.add_argument("paths", nargs="+", help="zbold files, or directories of *zbold.txt files")
+    add.add_argument("--name", help="document name, when adding a single file (default: from the file name)")
+    remove = commands.add_parser("remove", help="drop documents from the index")
+    remove.add_argument("documents", nargs="+")
+    query = commands.add_parser("query", help="documents and sections where a term is bold")
+    query.add_argument("term")
+    query.add_argument("--prefix", action="store_true", help="match every term starting with TERM")
+    query.add_argument("--limit", type=int, default=None)
+    commands.add_parser("stats", help="size of the index")
+    args = parser.parse_args()
+
+    index = TermIndex(args.index)
+    if args.command == "add":
+        paths = list(find_bold_files(args.paths))
+        if args.name and len(paths) != 1:
+            parser.error("--name needs exactly one file")
+        for path in paths:
+            count = index.add_bold_file(path, args.name)
+            print(f"Indexed {count} terms from {path} as {args.name or bold_file_document(path)}")
+    elif args.command == "remove":
+        missing = [document for document in args.documents if not index.remove(document)]
+        for document in missing:
+            print(f"Not indexed: {document}", file=sys.stderr)
+        sys.exit(1 if missing else 0)
+    elif args.command == "query":
+        start = time.perf_counter()
+        postings = index.lookup(args.term, args.prefix, args.limit)
+        elapsed = time.perf_counter() - start
+        for posting in postings:
+            print(f"{posting.count:6d}  {posting.document}  {posting.section_id}  {posting.term}")
+        print(f"{len(postings)} postings in {elapsed * 1000:.1f} ms", file=sys.stderr)
+    else:
+        for name, value in index.stats().items():
+            print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
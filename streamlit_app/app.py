@@ -3,39 +3,107 @@ import streamlit as st
 # Must set page config first before any other Streamlit commands
 st.set_page_config(page_title="Bold Text Extractor", layout="wide")
 
+import asyncio
+import hashlib
 import os
-import tempfile
-import openai
-from docx import Document
+import sys
 import re
 from pathlib import Path
 import json
 import traceback
 
+# The boldwords package lives at the repository root; this also works when it is not installed
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from boldwords.pipeline import ENGINES, read_paragraphs
+from boldwords.extraction import SectionHeader, build_outline, iter_bold_spans
+from boldwords.header_align import aligned_headers, align_headers
+from boldwords.header_cache import HeaderCache, cache_key
+from boldwords.header_chunks import chunk_text, estimate_tokens, merge_headers
+from boldwords.header_detect import candidate_lines, detect_headers, select_candidates
+from boldwords.profiling import NULL_PROFILE, Profile
+from boldwords.records import document_id, parquet_available, render_rows
+from boldwords.revisions import RevisionStore, document_key, reextract
+
 # Add debug mode
 debug_mode = True
 
+# Paragraph reader used for every upload, see boldwords.pipeline.iter_docx_paragraphs
+engine = "docx"
+
+# Skip the local header detector and always ask the model
+always_use_llm = False
+
+# Send the model only candidate header lines instead of the whole text
+prefilter_candidates = os.environ.get("HEADER_PREFILTER", "1") != "0"
+
+# Reuse headers and unchanged paragraphs from the previous upload of a document
+incremental = os.environ.get("BOLDWORDS_INCREMENTAL", "1") != "0"
+
+# Whose previous revisions are reused: uploads made with the same key (a
+# name, say) share them across sessions and page reloads; with no key every
+# upload of a file name shares one revision with all users of the app
+revision_key = os.environ.get("BOLDWORDS_REVISION_KEY", "")
+
 def debug_print(message):
     """Print debug messages if debug mode is enabled"""
     if debug_mode:
         st.write(f"🔍 DEBUG: {message}")
 
-# Get the OpenAI API key from environment variable and set it
+# Header identification request; all three parts feed the cache key
+HEADER_MODEL = "gpt-4o"
+HEADER_SYSTEM_PROMPT = "You are a document analysis assistant. Your task is to identify section headers in the document."
+HEADER_PROMPT = "Below is the text of a document. Please identify the main section headers that divide this document into logical parts. Return ONLY a JSON array of strings containing ONLY the header text."
+HEADER_CANDIDATE_PROMPT = "Below are candidate lines from a document, one per line. Each starts with its paragraph number in brackets and ends with the start of the paragraph that follows it after \"| next:\". Identify the lines that are main section headers dividing the document into logical parts. Return ONLY a JSON array of their paragraph numbers."
+
+# Longer documents are split into chunks of about this many tokens, sent
+# HEADER_CONCURRENCY at a time, and their headers merged
+HEADER_CHUNK_TOKENS = int(os.environ.get("HEADER_CHUNK_TOKENS", 8000))
+HEADER_CONCURRENCY = int(os.environ.get("HEADER_CONCURRENCY", 4))
+
+# Each request attempt gives up after HEADER_TIMEOUT seconds; transient
+# failures are retried up to HEADER_RETRIES times with backoff
+HEADER_TIMEOUT = float(os.environ.get("HEADER_TIMEOUT", 30))
+HEADER_RETRIES = int(os.environ.get("HEADER_RETRIES", 3))
+
+# Documents whose structure gives headers with at least this confidence
+# (see header_detect) are not sent to the model
+HEADER_CONFIDENCE = float(os.environ.get("HEADER_CONFIDENCE", 0.8))
+
+# Term record downloads offered next to the text one: (format, label, MIME type)
+RECORD_DOWNLOADS = (
+    ("jsonl", "Download as JSON Lines", "application/x-ndjson"),
+    ("csv", "Download as CSV", "text/csv"),
+    ("parquet", "Download as Parquet", "application/vnd.apache.parquet"),
+)
+
+# Processed uploads kept per browser session, so widget interactions (which
+# rerun this script) show them again instead of re-parsing and re-asking the model
+SESSION_RESULTS = int(os.environ.get("BOLDWORDS_SESSION_RESULTS", 4))
+
+@st.cache_resource
+def open_stores():
+    """The header cache and revision store, opened once per server process rather than on every rerun"""
+    return HeaderCache(), RevisionStore()
+
+# Headers already identified for identical documents, shared by all workers;
+# and the state of the last revision of each document (by revision key and
+# file name), so a new revision only reprocesses what changed
+header_cache, revision_store = open_stores()
+
+# Get the OpenAI API key from environment variable; it is passed to every request
 api_key = os.environ.get("API")
 if api_key:
     debug_print(f"API key found: {api_key[:4]}...{api_key[-4:]}")
-    openai.api_key = api_key
 else:
     st.error("OpenAI API key not found. Please set the API environment variable.")
     debug_print("API key not found in environment variables")
 
-def convert_docx_to_raw_text(docx_file):
-    """Convert a docx file to a plain text for OpenAI processing"""
-    debug_print(f"Converting document: {docx_file}")
-    doc = Document(docx_file)
+def convert_docx_to_raw_text(paragraphs):
+    """Convert parsed docx paragraphs to a plain text for OpenAI processing"""
+    debug_print(f"Converting {len(paragraphs)} parsed paragraphs")
     text = []
     paragraph_count = 0
-    for para in doc.paragraphs:
+    for para in paragraphs:
         if para.text.strip():
             text.append(para.text.strip())
             paragraph_count += 1
@@ -46,251 +114,218 @@ def convert_docx_to_raw_text(docx_file):
         st.expander("Document Text Preview").text(result[:500] + "..." if len(result) > 500 else result)
     return result
 
-def identify_headers_with_openai(text):
-    """Use OpenAI to identify potential section headers in the document"""
+def header_client(**options):
+    """A client for one round of header requests; use inside ``async with``
+    
+    openai and aiohttp are only imported here, once a request is about to be made.
+    """
+    from boldwords.llm_client import LLMClient
+    settings = {"timeout": HEADER_TIMEOUT, "max_retries": HEADER_RETRIES, "concurrency": HEADER_CONCURRENCY}
+    settings.update(options)
+    return LLMClient(HEADER_MODEL, api_key=api_key, **settings)
+
+async def request_completion(client, user_content, log=debug_print):
+    """Send one header request to the model and return the text of its answer; raises on failure
+    
+    ``log`` receives the progress messages. Chunk requests run concurrently,
+    so they collect them instead of printing.
+    """
+    log(f"Sending request to {HEADER_MODEL} (timeout {client.timeout}s, up to {client.max_retries} retries)")
+    content = await client.chat(
+        [
+            {"role": "system", "content": HEADER_SYSTEM_PROMPT},
+            {"role": "user", "content": user_content}
+        ],
+        log=log,
+        temperature=0.3,
+    )
+    log("OpenAI request successful")
+    log(f"Raw response: {content}")
+    return content
+
+def parse_json_array(headers_json, log=debug_print):
+    """Pull the JSON array of strings or numbers out of a model answer"""
+    # Handle cases where the response might include markdown or explanations
+    if "```json" in headers_json:
+        log("Found JSON code block with json tag")
+        headers_json = headers_json.split("```json")[1].split("```")[0].strip()
+    elif "```" in headers_json:
+        log("Found generic code block")
+        headers_json = headers_json.split("```")[1].split("```")[0].strip()
+    
+    # Try to extract just the JSON array if there's surrounding text
+    headers_match = (re.search(r'\[\s*"[^"]*"(?:\s*,\s*"[^"]*")*\s*\]', headers_json)
+                     or re.search(r'\[\s*\d+(?:\s*,\s*\d+)*\s*\]', headers_json))
+    if headers_match:
+        log("Extracted JSON array from response text")
+        headers_json = headers_match.group(0)
+    
+    log(f"Processed JSON: {headers_json}")
+    
+    try:
+        headers = json.loads(headers_json)
+        log(f"Successfully parsed JSON: {headers}")
+    except json.JSONDecodeError as e:
+        log(f"JSON parse error: {str(e)}")
+        # Try one more cleanup attempt - sometimes quotes are wrong
+        clean_json = headers_json.replace("'", '"')
+        log(f"Attempting with cleaned JSON: {clean_json}")
+        try:
+            headers = json.loads(clean_json)
+        except json.JSONDecodeError:
+            raise ValueError(f"Response was not a JSON array: {headers_json}") from e
+    
+    if not isinstance(headers, list):
+        raise ValueError(f"Response was not a JSON array: {headers_json}")
+    return headers
+
+async def request_headers(client, text, log=debug_print):
+    """Ask the model for the section headers in document ``text``"""
+    log(f"Prompt: {HEADER_PROMPT}")
+    content = await request_completion(
+        client,
+        f"{HEADER_PROMPT} Example: [\"Introduction\", \"Methods\", \"Results\", \"Discussion\"]. Don't include any explanations, just the JSON array.\n\n{text}",
+        log,
+    )
+    return [header for header in parse_json_array(content, log) if isinstance(header, str)]
+
+async def request_header_indices(client, lines, log=debug_print):
+    """Ask the model which of the candidate ``lines`` are headers; returns paragraph indices"""
+    log(f"Prompt: {HEADER_CANDIDATE_PROMPT}")
+    content = await request_completion(
+        client,
+        f"{HEADER_CANDIDATE_PROMPT} Example: [0, 14, 27]. Don't include any explanations, just the JSON array.\n\n{lines}",
+        log,
+    )
+    return [index for index in parse_json_array(content, log) if isinstance(index, int)]
+
+async def request_in_chunks(client, chunks, request):
+    """Run ``request`` on each chunk concurrently; return the per-chunk results, None for failures"""
+    logs = [[] for _ in chunks]
+    outcomes = await client.map(
+        lambda i: request(client, chunks[i], logs[i].append),
+        range(len(chunks)),
+    )
+    
+    results = []
+    failed = 0
+    for i, (log, (result, error)) in enumerate(zip(logs, outcomes)):
+        for message in log:
+            debug_print(f"[chunk {i + 1}/{len(chunks)}] {message}")
+        if error is not None:
+            failed += 1
+            debug_print(f"[chunk {i + 1}/{len(chunks)}] Failed: {error}")
+        results.append(result)
+    
+    if failed == len(chunks):
+        raise RuntimeError(f"Header identification failed for all {len(chunks)} chunks: {outcomes[0][1]}")
+    if failed:
+        st.warning(f"Header identification failed for {failed} of {len(chunks)} chunks; "
+                   "headers from those parts of the document may be missing.")
+    return results
+
+async def request_all(chunks, request):
+    """Run ``request`` on every chunk with one client; returns the per-chunk results"""
+    async with header_client() as client:
+        if len(chunks) == 1:
+            return [await request(client, chunks[0])]
+        return await request_in_chunks(client, chunks, request)
+
+def identify_headers_with_openai(text, paragraphs=None, refresh=False):
+    """Use OpenAI to identify potential section headers in the document
+    
+    With ``paragraphs`` and prefiltering enabled, only candidate header lines
+    are sent (see header_detect.select_candidates) and the model answers with
+    their paragraph indices, which are mapped back to the paragraph text.
+    With ``refresh`` the model is asked even when the header cache has an
+    answer, which the new one replaces.
+    """
     try:
         debug_print("Starting header identification with OpenAI")
-        if not openai.api_key:
+        candidates = None
+        if paragraphs is not None and prefilter_candidates:
+            indices = select_candidates(paragraphs)
+            candidates = candidate_lines(paragraphs, indices)
+            debug_print(f"Sending {len(indices)} of {len(paragraphs)} paragraphs as candidate lines "
+                        f"(~{estimate_tokens(candidates)} instead of ~{estimate_tokens(text)} tokens)")
+            key = cache_key(candidates, f"{HEADER_SYSTEM_PROMPT}\n{HEADER_CANDIDATE_PROMPT}", HEADER_MODEL)
+        else:
+            key = cache_key(text, f"{HEADER_SYSTEM_PROMPT}\n{HEADER_PROMPT}", HEADER_MODEL)
+        cached_headers = None if refresh else header_cache.get(key)
+        if cached_headers is not None:
+            debug_print(f"Header cache hit {key[:12]}: {cached_headers}")
+            return cached_headers
+        debug_print(f"Header cache {'bypassed' if refresh else 'miss'} {key[:12]}")
+        
+        if not api_key:
             st.error("OpenAI API key is not set. Cannot identify headers.")
             return []
         
-        debug_print(f"Using model: gpt-4o")
-        debug_print(f"Document length: {len(text)} characters")
+        debug_print(f"Using model: {HEADER_MODEL}")
+        debug_print(f"Document length: {len(text)} characters (~{estimate_tokens(text)} tokens)")
         
-        # For debugging, show what model versions are available
-        try:
-            debug_print("OpenAI module version: " + openai.__version__)
-        except:
-            debug_print("Could not determine OpenAI module version")
-            
-        # Show what request we're making
-        prompt = "Below is the text of a document. Please identify the main section headers that divide this document into logical parts. Return ONLY a JSON array of strings containing ONLY the header text."
-        debug_print(f"Prompt: {prompt}")
+        if candidates is not None:
+            chunks = chunk_text(candidates, HEADER_CHUNK_TOKENS)
+            if len(chunks) > 1:
+                debug_print(f"Split candidates into {len(chunks)} chunks, {HEADER_CONCURRENCY} requests at a time")
+            results = asyncio.run(request_all(chunks, request_header_indices))
+            wanted = set(indices)
+            found = sorted({i for result in results for i in (result or []) if i in wanted})
+            headers = []
+            for i in found:
+                header = paragraphs[i].text.strip()
+                if header not in headers:
+                    headers.append(header)
+        else:
+            chunks = chunk_text(text, HEADER_CHUNK_TOKENS)
+            if len(chunks) > 1:
+                debug_print(f"Split document into {len(chunks)} chunks, {HEADER_CONCURRENCY} requests at a time")
+            headers = merge_headers(chunks, asyncio.run(request_all(chunks, request_headers)))
         
-        try:
-            # First try the newer format
-            debug_print("Attempting API call with newer ChatCompletion format")
-            response = openai.ChatCompletion.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are a document analysis assistant. Your task is to identify section headers in the document."},
-                    {"role": "user", "content": f"{prompt} Example: [\"Introduction\", \"Methods\", \"Results\", \"Discussion\"]. Don't include any explanations, just the JSON array.\n\n{text}"}
-                ],
-                temperature=0.3,
-            )
-        except Exception as e1:
-            debug_print(f"Error with ChatCompletion: {str(e1)}")
-            try:
-                # Try older format as fallback
-                debug_print("Attempting API call with older completion format")
-                response = openai.Completion.create(
-                    engine="gpt-4o",
-                    prompt=f"Identify the main section headers in this document. Return only a JSON array of headers:\n\n{text}",
-                    max_tokens=1000,
-                    temperature=0.3,
-                )
-                # Create compatible response format
-                response = {"choices": [{"message": {"content": response.choices[0].text}}]}
-                debug_print("Successfully used older format")
-            except Exception as e2:
-                debug_print(f"Error with Completion fallback: {str(e2)}")
-                raise
-        
-        debug_print("OpenAI request successful")
-        
-        # Handle different response formats
-        try:
-            # Try newer format first
-            headers_json = response.choices[0].message['content'].strip()
-            debug_print("Parsed response using newer format")
-        except (AttributeError, KeyError, TypeError) as e:
-            debug_print(f"Error parsing response with newer format: {str(e)}")
-            try:
-                # Try legacy format
-                headers_json = response.choices[0].text.strip()
-                debug_print("Parsed response using legacy format")
-            except Exception as e2:
-                debug_print(f"Error parsing response with legacy format: {str(e2)}")
-                # Last resort - try direct access to dict
-                headers_json = response['choices'][0]['message']['content'].strip()
-        
-        debug_print(f"Raw response: {headers_json}")
-        
-        # Handle cases where the response might include markdown or explanations
-        if "```json" in headers_json:
-            debug_print("Found JSON code block with json tag")
-            headers_json = headers_json.split("```json")[1].split("```")[0].strip()
-        elif "```" in headers_json:
-            debug_print("Found generic code block")
-            headers_json = headers_json.split("```")[1].split("```")[0].strip()
-        
-        # Try to extract just the JSON array if there's surrounding text
-        headers_match = re.search(r'\[\s*"[^"]*"(?:\s*,\s*"[^"]*")*\s*\]', headers_json)
-        if headers_match:
-            debug_print("Extracted JSON array from response text")
-            headers_json = headers_match.group(0)
-        
-        debug_print(f"Processed JSON: {headers_json}")
-        
-        try:
-            headers = json.loads(headers_json)
-            debug_print(f"Successfully parsed JSON: {headers}")
-            return headers
-        except json.JSONDecodeError as e:
-            debug_print(f"JSON parse error: {str(e)}")
-            # Try one more cleanup attempt - sometimes quotes are wrong
-            clean_json = headers_json.replace("'", '"')
-            debug_print(f"Attempting with cleaned JSON: {clean_json}")
-            headers = json.loads(clean_json)
-            return headers
+        if headers:
+            header_cache.put(key, headers)
+        return headers
             
     except Exception as e:
         st.error(f"Error identifying headers with OpenAI: {str(e)}")
         debug_print(f"Full exception: {traceback.format_exc()}")
-        st.error(f"Response was: {headers_json if 'headers_json' in locals() else 'No response'}")
         return []
 
-def process_document(docx_file, headers):
-    """Process the document to extract text and bold words using the given headers"""
-    # This function implements the core functionality from working2.py
+def span_dicts(spans):
+    """The extracted words shown and downloaded for an upload, one dict per extraction.BoldSpan"""
+    return [
+        {
+            "section": str(span.section),
+            "subsection": span.subsection,
+            "section_id": span.section_id,
+            "text": span.text,
+            "paragraph": span.index,
+            "start": span.start,
+            "end": span.end,
+            "container": span.container,
+        }
+        for span in spans
+    ]
+
+def process_document(paragraphs, headers, profile=NULL_PROFILE):
+    """Process parsed docx paragraphs to extract text and bold words using the given headers"""
+    # This function implements the core functionality of boldwords.pipeline
     try:
         debug_print(f"Processing document with {len(headers)} headers: {headers}")
-        doc = Document(docx_file)
-        
-        formatted_text = []
-        extracted_words = []
-        
-        current_section = None
-        current_subsection = None
-        
-        section_counter = 0
-        
-        for i, para in enumerate(doc.paragraphs):
-            if not para.text.strip():
-                continue
-                
-            text = para.text.strip()
-            
-            # Check if paragraph contains any headers
-            header_match = False
-            matching_header = None
-            
-            for keyword in headers:
-                if keyword in text:
-                    header_match = True
-                    matching_header = keyword
-                    break
-                    
-            if header_match:
-                debug_print(f"Found header match: {matching_header} in paragraph {i}")
-                section_counter += 1
-                current_section = str(section_counter)
-                
-                processed_text = ""
-                for run in para.runs:
-                    if run.bold:
-                        processed_text += f"*{run.text}*"
-                    else:
-                        processed_text += run.text
-                
-                formatted_text.append(f"{current_section}. {processed_text}")
-                continue
-            
-            subsection_match = re.match(r'^([a-z])\.\s+(.*)', text)
-            
-            if subsection_match:
-                subsection_letter = subsection_match.group(1)
-                subsection_content = subsection_match.group(2)
-                
-                processed_text = ""
-                for run in para.runs:
-                    if run.bold:
-                        processed_text += f"*{run.text}*"
-                    else:
-                        processed_text += run.text
-                
-                letter_part = processed_text[:2]
-                content_part = processed_text[2:].lstrip()
-                
-                formatted_text.append(f"   {subsection_letter}. {content_part}")
-                continue
-            
-            if current_section and len(formatted_text) > 0 and formatted_text[-1].startswith(f"{current_section}."):
-                subsection_letter = "a"
-                debug_print(f"Adding first subsection to section {current_section}")
-                
-                processed_text = ""
-                for run in para.runs:
-                    if run.bold:
-                        processed_text += f"*{run.text}*"
-                    else:
-                        processed_text += run.text
-                
-                formatted_text.append(f"   {subsection_letter}. {processed_text}")
-                current_subsection = subsection_letter
-                continue
-                
-            if current_section and len(formatted_text) > 0:
-                last_line = formatted_text[-1]
-                if last_line.startswith("   "):
-                    last_letter_match = re.match(r'\s+([a-z])\.\s+', last_line)
-                    if last_letter_match:
-                        last_letter = last_letter_match.group(1)
-                        next_letter = chr(ord(last_letter) + 1)
-                        debug_print(f"Adding sequential subsection {next_letter} to section {current_section}")
-                        
-                        processed_text = ""
-                        for run in para.runs:
-                            if run.bold:
-                                processed_text += f"*{run.text}*"
-                            else:
-                                processed_text += run.text
-                        
-                        formatted_text.append(f"   {next_letter}. {processed_text}")
-                        current_subsection = next_letter
-                        continue
-            
-            processed_text = ""
-            for run in para.runs:
-                if run.bold:
-                    processed_text += f"*{run.text}*"
-                else:
-                    processed_text += run.text
-            
-            formatted_text.append(f"      {processed_text}")
+        blocks = list(profile.iterate("header matching", build_outline(paragraphs, headers)))
+        if debug_mode:
+            debug_print(f"Header matches in paragraphs "
+                        f"{[block.index for block in blocks if isinstance(block, SectionHeader)]}")
         
+        # Text is only rendered here, for display; bold terms come from the runs
+        with profile.stage("markup"):
+            formatted_text = [block.render() for block in blocks]
         debug_print(f"Initial document processing complete. Formatted {len(formatted_text)} paragraphs.")
         
         # Extract bold words
-        bold_count = 0
-        for line in formatted_text:
-            if not line.strip():
-                continue
-            
-            section_match = re.match(r'^(\d+)\.\s+', line)
-            if section_match:
-                current_section = section_match.group(1)
-                current_subsection = None
-                continue
-            
-            subsection_match = re.match(r'^\s*([a-z])\.\s+', line)
-            if subsection_match:
-                current_subsection = subsection_match.group(1)
-            
-            if current_section and current_subsection:
-                bold_matches = re.findall(r'\*(.*?)\*', line)
-                
-                for bold_word in bold_matches:
-                    if bold_word.strip():
-                        section_id = f"{current_section}{current_subsection}"
-                        entry = {
-                            "section": current_section,
-                            "subsection": current_subsection,
-                            "section_id": section_id,
-                            "text": bold_word.strip()
-                        }
-                        extracted_words.append(entry)
-                        bold_count += 1
+        with profile.stage("bold extraction"):
+            extracted_words = span_dicts(iter_bold_spans(blocks))
+        bold_count = len(extracted_words)
         
         debug_print(f"Bold word extraction complete. Found {bold_count} bold terms.")
         return formatted_text, extracted_words
@@ -300,6 +335,132 @@ def process_document(docx_file, headers):
         debug_print(f"Full exception: {traceback.format_exc()}")
         return [], []
 
+def choose_headers(paragraphs, profile=NULL_PROFILE, refresh=False):
+    """Take headers from the document structure when it is clear enough, otherwise ask OpenAI"""
+    with profile.stage("header detection"):
+        detection = detect_headers(paragraphs)
+    debug_print(f"Structural header detection: confidence {detection.confidence}, "
+                f"headers at paragraphs {detection.indices}: {detection.headers}")
+    if detection.confidence >= HEADER_CONFIDENCE and not always_use_llm:
+        st.info(f"Found {len(detection.headers)} headers from the document structure "
+                f"(confidence {detection.confidence:.0%}); OpenAI was not needed.")
+        return detection.headers
+    
+    # Convert document to text
+    with profile.stage("raw text"):
+        raw_text = convert_docx_to_raw_text(paragraphs)
+    debug_print(f"Converted document to {len(raw_text)} characters of text")
+    with profile.stage("llm call"):
+        headers = identify_headers_with_openai(raw_text, paragraphs, refresh)
+    
+    # The model may return a header slightly unlike the document text
+    # (quotes, punctuation, casing); point each one at its paragraph
+    with profile.stage("header alignment"):
+        alignments = align_headers(paragraphs, headers)
+    for alignment in alignments:
+        if alignment.text is None:
+            debug_print(f"No paragraph matches header {alignment.header!r} (best score {alignment.score:.2f})")
+        elif alignment.text != alignment.header:
+            debug_print(f"Aligned header {alignment.header!r} to paragraph {alignment.index} "
+                        f"{alignment.text!r} (score {alignment.score:.2f})")
+    return aligned_headers(alignments)
+
+def revision_results(revision):
+    """The (formatted_text, extracted_words) of process_document, from a revisions.Revision"""
+    return revision.lines, span_dicts(revision.spans)
+
+def show_timings(profile):
+    """Collapsed table of the time spent in each stage of the last upload"""
+    rows = profile.rows()
+    if not rows:
+        return
+    total = sum(seconds for _, _, seconds, _ in rows)
+    with st.expander(f"Stage timings ({total * 1000:.0f} ms)"):
+        st.table([
+            {"stage": name, "calls": calls, "time (ms)": round(seconds * 1000, 2), "share": f"{share:.1%}"}
+            for name, calls, seconds, share in rows
+        ])
+
+def upload_digest(uploaded_file):
+    """SHA-256 of an upload's content, computed once per uploaded file and session"""
+    digests = st.session_state.setdefault("upload_digests", {})
+    if uploaded_file.file_id not in digests:
+        with uploaded_file.getbuffer() as data:
+            digests[uploaded_file.file_id] = hashlib.sha256(data).hexdigest()
+    return digests[uploaded_file.file_id]
+
+def session_results():
+    """This session's processed uploads: {(upload digest, settings...): (headers, text, words)}"""
+    return st.session_state.setdefault("results", {})
+
+def forget_upload(digest):
+    """Drop every stored result of one upload, so it is processed afresh"""
+    results = session_results()
+    for key in [key for key in results if key[0] == digest]:
+        del results[key]
+
+def header_settings():
+    """Settings that decide how headers are chosen; a revision made with others is not reused"""
+    return {
+        "always_use_llm": always_use_llm,
+        "prefilter_candidates": prefilter_candidates,
+        "model": HEADER_MODEL,
+        "confidence": HEADER_CONFIDENCE,
+    }
+
+def revision_scope():
+    """Revision store scope of the revision key, or None to share revisions by file name"""
+    key = revision_key.strip()
+    return hashlib.sha256(key.encode()).hexdigest()[:16] if key else None
+
+def run_stages(uploaded_file, profile, refresh=False):
+    """Parse an upload, find its headers and extract its bold words
+
+    Returns (headers, formatted_text, extracted_words); the headers are empty
+    when none could be identified. With ``refresh`` neither the previous
+    revision of the document nor the header cache is used.
+    """
+    # Parse the upload once, straight from the uploaded buffer (no copy);
+    # every later stage shares this result
+    uploaded_file.seek(0)
+    paragraphs = read_paragraphs(uploaded_file, engine, profile)
+    debug_print(f"Parsed {len(paragraphs)} paragraphs with the {engine} engine")
+    
+    if incremental:
+        # Only what changed since the last upload of this document is
+        # reprocessed; headers are only looked for again when a
+        # header-like paragraph changed
+        key = document_key(uploaded_file.name, revision_scope())
+        with profile.stage("revision"):
+            previous = None if refresh else revision_store.get(key)
+            revision = reextract(paragraphs, lambda ps: choose_headers(ps, profile, refresh), previous,
+                                 header_settings=header_settings())
+        headers = revision.headers
+        if headers:
+            revision_store.put(key, revision.state)
+            if revision.reused or revision.headers_reused:
+                st.info(f"Reused {revision.reused} unchanged paragraphs from the previous revision "
+                        f"of {uploaded_file.name} and reprocessed {revision.placed}"
+                        + ("; headers unchanged." if revision.headers_reused else "."))
+    else:
+        headers = choose_headers(paragraphs, profile, refresh)
+    
+    if not headers:
+        return [], [], []
+    debug_print(f"Identified {len(headers)} headers: {headers}")
+    
+    # Process document and extract bold words
+    if incremental:
+        formatted_text, extracted_words = revision_results(revision)
+    else:
+        formatted_text, extracted_words = process_document(paragraphs, headers, profile)
+    return headers, formatted_text, extracted_words
+
+async def test_connection():
+    """One short request with a short timeout and no retries"""
+    async with header_client(timeout=10, max_retries=0, concurrency=1) as client:
+        return await client.chat([{"role": "user", "content": "Say hello"}], max_tokens=5)
+
 def main():
     st.title("Document Bold Text Extractor")
     
@@ -311,33 +472,52 @@ def main():
     
     # Debug controls
     with st.expander("Debug Settings"):
-        global debug_mode
+        global debug_mode, engine, always_use_llm, prefilter_candidates, incremental, revision_key
         debug_mode = st.checkbox("Enable Debug Mode", value=False)
+        always_use_llm = st.checkbox(
+            "Always ask OpenAI for headers",
+            value=False,
+            help=f"By default the model is only consulted when the document structure "
+                 f"gives headers with less than {HEADER_CONFIDENCE:.0%} confidence",
+        )
+        incremental = st.checkbox(
+            "Reuse results from earlier revisions",
+            value=incremental,
+            help="A re-uploaded document (same file name and revision key) only has its changed paragraphs "
+                 "reprocessed, and headers are only identified again when a header-like paragraph changed",
+        )
+        revision_key = st.text_input(
+            "Revision key",
+            value=revision_key,
+            help="Your name or any key of your own: earlier revisions are only reused for uploads made with "
+                 "the same key, in any session. Left empty, everyone uploading a file of the same name "
+                 "shares, and replaces, its last revision",
+        )
+        prefilter_candidates = st.checkbox(
+            "Send only candidate header lines to OpenAI",
+            value=prefilter_candidates,
+            help="Short, styled, bold-only or differently numbered paragraphs, tagged with their "
+                 "paragraph numbers, instead of the full document text",
+        )
+        engine = st.selectbox(
+            "Extraction engine",
+            ENGINES,
+            help="docx walks the python-docx object tree, loading every part of the package; stream parses "
+                 "only word/document.xml and word/styles.xml, incrementally, and never reads embedded media",
+        )
+        stats = header_cache.stats()
+        st.caption(
+            f"Header cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['entries']} entries ({stats['bytes']} bytes)"
+        )
         if st.button("Test OpenAI Connection"):
             try:
-                if not openai.api_key:
+                if not api_key:
                     st.error("API key not set")
                 else:
                     debug_print("Testing OpenAI connection...")
-                    try:
-                        # Try completion API
-                        response = openai.Completion.create(
-                            engine="gpt-3.5-turbo-instruct",
-                            prompt="Say hello",
-                            max_tokens=5
-                        )
-                        st.success(f"OpenAI API Completion test successful: {response.choices[0].text}")
-                    except Exception as e1:
-                        debug_print(f"Completion API test failed: {str(e1)}")
-                        try:
-                            # Try chat completion API
-                            response = openai.ChatCompletion.create(
-                                model="gpt-3.5-turbo",
-                                messages=[{"role": "user", "content": "Say hello"}]
-                            )
-                            st.success(f"OpenAI ChatCompletion API test successful")
-                        except Exception as e2:
-                            st.error(f"ChatCompletion API test failed: {str(e2)}")
+                    reply = asyncio.run(test_connection())
+                    st.success(f"OpenAI API test successful: {reply}")
             except Exception as e:
                 st.error(f"Error testing API: {str(e)}")
     
@@ -346,29 +526,39 @@ def main():
     if uploaded_file is not None:
         debug_print(f"File uploaded: {uploaded_file.name}")
         
-        # Save the uploaded file to a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp:
-            tmp.write(uploaded_file.getvalue())
-            temp_file_path = tmp.name
-            debug_print(f"Saved upload to temporary file: {temp_file_path}")
+        digest = upload_digest(uploaded_file)
+        # Runs the document afresh: no stored results, previous revision or
+        # cached headers (the fresh headers replace the cached ones)
+        refresh = st.button("Reprocess Document", help="Parse the document and identify its headers again, "
+                                                       "asking the model even when it was asked before")
+        if refresh:
+            forget_upload(digest)
+        # Only settings that change the results are part of the key; ticking
+        # debug mode, say, shows the stored results again
+        key = (digest, engine, incremental, always_use_llm, prefilter_candidates)
+        results = session_results()
         
+        profile = Profile()
         try:
             with st.spinner("Processing document..."):
-                # Convert document to text
-                raw_text = convert_docx_to_raw_text(temp_file_path)
-                debug_print(f"Converted document to {len(raw_text)} characters of text")
-                
-                # Identify headers with OpenAI
-                headers = identify_headers_with_openai(raw_text)
+                # A stored result skips every stage, so the timings below only
+                # show what this rerun did
+                if key in results:
+                    headers, formatted_text, extracted_words = results[key]
+                    st.caption("Showing the results already computed for this document; "
+                               "use Reprocess Document to run it again.")
+                else:
+                    headers, formatted_text, extracted_words = run_stages(uploaded_file, profile, refresh)
+                    # A failed identification (say, a model timeout) is tried
+                    # again on the next rerun rather than remembered
+                    if headers:
+                        results[key] = (headers, formatted_text, extracted_words)
+                        while len(results) > SESSION_RESULTS:
+                            del results[next(iter(results))]
                 
                 if not headers:
                     st.warning("No headers were identified. Please try a different document.")
                     return
-                    
-                debug_print(f"Identified {len(headers)} headers: {headers}")
-                
-                # Process document and extract bold words
-                formatted_text, extracted_words = process_document(temp_file_path, headers)
                 
                 if not extracted_words:
                     st.warning("No bold words were found in the document.")
@@ -378,7 +568,8 @@ def main():
                 output_text = []
                 sections = {}
                 
-                # Group words by section for display
+                # Group words by section for display; the dicts keep document order,
+                # so section 10 follows 9 and subsection aa follows z
                 for word in extracted_words:
                     section_id = word["section"]
                     if section_id not in sections:
@@ -391,9 +582,9 @@ def main():
                     sections[section_id][subsection_id].append(word["text"])
                 
                 # Create a simple text representation
-                for section_id in sorted(sections.keys()):
+                for section_id in sections:
                     output_text.append(f"SECTION {section_id}")
-                    for subsection_id in sorted(sections[section_id].keys()):
+                    for subsection_id in sections[section_id]:
                         output_text.append(f"  {section_id}{subsection_id}:")
                         words = sections[section_id][subsection_id]
                         for word in words:
@@ -405,13 +596,14 @@ def main():
                 st.text_area("Extracted Bold Words", "\n".join(output_text), height=400)
                 
                 # Create simplified format for download (like zbold.txt)
-                simplified_output = []
-                for section_id in sorted(sections.keys()):
-                    for subsection_id in sorted(sections[section_id].keys()):
-                        section_subsection = f"{section_id}{subsection_id}"
-                        words = sections[section_id][subsection_id]
-                        for word in words:
-                            simplified_output.append(f"{section_subsection}: {word}")
+                with profile.stage("output write"):
+                    simplified_output = []
+                    for section_id in sections:
+                        for subsection_id in sections[section_id]:
+                            section_subsection = f"{section_id}{subsection_id}"
+                            words = sections[section_id][subsection_id]
+                            for word in words:
+                                simplified_output.append(f"{section_subsection}: {word}")
                 
                 # Add a download button for the text in simplified format
                 st.download_button(
@@ -421,6 +613,22 @@ def main():
                     mime="text/plain"
                 )
                 
+                # The same terms as records, for analytics (see boldwords.records)
+                document = document_id(uploaded_file.name)
+                rows = [
+                    (document, int(word["section"]), word["subsection"], word["section_id"], word["text"],
+                     word["paragraph"], word["start"], word["end"], word["container"])
+                    for word in extracted_words
+                ]
+                columns = st.columns(3)
+                for column, (fmt, label, mime) in zip(columns, RECORD_DOWNLOADS):
+                    if fmt == "parquet" and not parquet_available():
+                        column.caption("Install pyarrow for Parquet downloads")
+                        continue
+                    with profile.stage("output write"):
+                        data = render_rows(rows, fmt)
+                    column.download_button(label=label, data=data, file_name=f"{document}.terms.{fmt}", mime=mime)
+                
                 # Add refresh button at the bottom
                 st.write("")
                 if st.button("Process Another Document"):
@@ -430,10 +638,7 @@ def main():
             st.error(f"Error processing document: {str(e)}")
             debug_print(f"Full exception: {traceback.format_exc()}")
         finally:
-            # Clean up the temporary file
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
-                debug_print(f"Cleaned up temporary file: {temp_file_path}")
+            show_timings(profile)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""Ways of extracting a document that must give the same output as the plain one"""
+import json
+from pathlib import Path
+
+import pytest
+
+from boldwords import parallel, pipeline
+from boldwords.corpus import generate_document
+from boldwords.extraction import build_outline, iter_block_spans
+from boldwords.revisions import reextract
+
+FILES = Path(__file__).resolve().parent.parent / "files"
+TESTING2_HEADERS = ["AI Has Grown Up", "Generative AI: AI That Creates Like a Human", "The Rise of Agentic AI",
+                    "Autonomous AI: Machines", "AI That Thinks", "Staying ahead"]
+
+
+@pytest.fixture(scope="module")
+def synthetic(tmp_path_factory):
+    path = tmp_path_factory.mktemp("docs") / "synthetic.docx"
+    return path, generate_document(path, 3000, headers=10, subsections=30)
+
+
+@pytest.fixture(scope="module", params=["synthetic", "testing2"])
+def document(request, synthetic):
+    """``(path, headers)`` of a document to extract"""
+    if request.param == "synthetic":
+        return synthetic
+    return FILES / "testing2.docx", TESTING2_HEADERS
+
+
+def terms(spans):
+    return [(span.render(), span.index, span.start, span.end) for span in spans]
+
+
+def extracted(path, headers, **options):
+    lines, spans = pipeline.extract(path, headers, **options)
+    return lines, terms(spans)
+
+
+@pytest.mark.parametrize("containers", [None, "all"])
+def test_engines_match(document, containers):
+    path, headers = document
+    assert (extracted(path, headers, engine="stream", containers=containers)
+            == extracted(path, headers, engine="docx", containers=containers))
+
+
+@pytest.mark.parametrize("engine", ["stream", "docx"])
+@pytest.mark.parametrize("numbering", [None, "alpha,roman"])
+def test_parallel_matches_serial(document, engine, numbering, monkeypatch):
+    # Small slices and chunks, so that sections and subsections cross them
+    monkeypatch.setattr(parallel, "SLICE_BYTES", 16 * 1024)
+    monkeypatch.setattr(parallel, "CHUNK_PARAGRAPHS", 150)
+    path, headers = document
+    assert (extracted(path, headers, engine=engine, numbering=numbering, jobs=3)
+            == extracted(path, headers, engine=engine, numbering=numbering))
+
+
+def full_extraction(paragraphs, headers):
+    lines, spans = [], []
+    for block, block_spans in iter_block_spans(build_outline(paragraphs, headers)):
+        lines.append(block.render())
+        spans.extend(block_spans)
+    return lines, terms(spans)
+
+
+def edit_body(paragraphs, headers):
+    edited = list(paragraphs)
+    for index in range(5, len(edited), 97):
+        paragraph = edited[index]
+        edited[index] = paragraph._replace(text=paragraph.text + "edited", runs=paragraph.runs + [("edited", True)])
+    del edited[40:45]
+    return edited, headers
+
+
+def insert_header(paragraphs, headers):
+    edited = list(paragraphs)
+    edited.insert(len(edited) // 2, paragraphs[0]._replace(text="Inserted Header", runs=[("Inserted Header", True)]))
+    return edited, headers[:1] + ["Inserted Header"] + headers[1:]
+
+
+def delete_header(paragraphs, headers):
+    index = next(i for i, p in enumerate(paragraphs) if p.text.strip() == headers[1])
+    return paragraphs[:index] + paragraphs[index + 1:], headers[:1] + headers[2:]
+
+
+@pytest.mark.parametrize("edit", [edit_body, insert_header, delete_header])
+def test_incremental_matches_full(synthetic, edit):
+    path, headers = synthetic
+    paragraphs = pipeline.read_paragraphs(path, "stream")
+    first = reextract(paragraphs, lambda _: headers)
+    # States are stored as JSON (see revisions.RevisionStore)
+    previous = json.loads(json.dumps(first.state))
+    edited, edited_headers = edit(paragraphs, headers)
+    revision = reextract(edited, lambda _: edited_headers, previous)
+    assert revision.headers == edited_headers
+    # Other headers may move every paragraph to another section: nothing is reused then
+    assert bool(revision.reused) == (edited_headers == headers)
+    assert (revision.lines, terms(revision.spans)) == full_extraction(edited, edited_headers)
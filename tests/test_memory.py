@@ -0,0 +1,14 @@
+"""The stream engine extracts a large package in bounded memory (see bench_memory.py)"""
+import sys
+
+import pytest
+
+from bench_memory import CEILING_MIB, peak_growth
+from boldwords.corpus import generate_document
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="peak_growth reads VmHWM from /proc")
+def test_stream_engine_stays_under_ceiling(tmp_path):
+    path = tmp_path / "large.docx"
+    headers = generate_document(path, 20000, headers=10, media=64)
+    assert peak_growth(path, "stream", headers) < CEILING_MIB